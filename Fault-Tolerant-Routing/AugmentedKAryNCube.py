@@ -1,14 +1,518 @@
 import csv
 import itertools
+import json
 import math
+import os
 import time
 from itertools import product
 import random
-from collections import deque
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 import heapq
 
 import networkx as nx
+import numpy as np
 from matplotlib import pyplot as plt
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+# 进程内的拓扑缓存：(n, k) -> AQTopology，同一 (n, k) 的所有实例共享
+_TOPOLOGY_CACHE = {}
+
+# 模式数据库单张表的默认最大条目数（uint8，约 4MB）
+PDB_MAX_ENTRIES = 1 << 22
+
+# _cayley_distances 逐层扩展时每块的节点数
+_CAYLEY_BLOCK_SIZE = 1 << 16
+
+# 下一跳路由表中目的节点自身对应的端口值（不再转发）
+NO_PORT = 255
+
+
+def _generator_specs(n, k):
+    """
+    AQ(n,k) 的生成元 (kind, i, direction)，kind 为 "single" 表示 (i, ±1)，"cascading" 表示 (≤i, ±1)
+    顺序：(0,-1), (0,+1), ..., (n-1,+1), (≤1,-1), (≤1,+1), ..., (≤n-1,+1)
+    k 较小时模 k 相同的生成元（如 k=2 时的 +1 与 -1）只保留第一个，零生成元（k=1）被去掉
+
+    :return: (specs, ports)，specs 为去重后的生成元列表，
+             ports 将每个原始生成元 (kind, i, direction) 映射为其在 specs 中的下标（即端口号）
+    """
+    all_specs = [("single", i, d) for i in range(n) for d in (-1, 1)]
+    all_specs += [("cascading", i, d) for i in range(1, n) for d in (-1, 1)]
+
+    specs = []
+    ports = {}
+    seen = {}
+    for kind, i, d in all_specs:
+        dims = range(i + 1) if kind == "cascading" else (i,)
+        offset = tuple(d % k if j in dims else 0 for j in range(n))
+        if not any(offset):
+            continue
+        if offset not in seen:
+            seen[offset] = len(specs)
+            specs.append((kind, i, d))
+        ports[(kind, i, d)] = seen[offset]
+    return specs, ports
+
+
+def _node_dtype(num_nodes):
+    """
+    能容纳全部节点编号的最小整数类型
+    """
+    return np.int32 if num_nodes < 2 ** 31 else np.int64
+
+
+def _neighbor_matrix(n, k, ids):
+    """
+    用下标算术一次性计算一组节点的全部邻居
+
+    :param ids: 节点编号数组（int64）
+    :return: 形状为 (len(ids), 度数) 的数组，列顺序与 _generator_specs 一致
+    """
+    topology = _TOPOLOGY_CACHE.get((n, k))
+    specs = topology.specs if topology is not None else _generator_specs(n, k)[0]
+
+    # 每一维上 ±1 对应的编号增量，以及前 i+1 维增量之和（(≤i,±1) 的增量）
+    steps = {}
+    cascading_steps = {}
+    for i in range(n):
+        weight = k ** (n - 1 - i)
+        digit = ids // weight % k
+        for d in (-1, 1):
+            steps[(i, d)] = ((digit + d) % k - digit) * weight
+            cascading_steps[(i, d)] = steps[(i, d)] if i == 0 else cascading_steps[(i - 1, d)] + steps[(i, d)]
+
+    neighbors = np.empty((len(ids), len(specs)), dtype=_node_dtype(k ** n))
+    for column, (kind, i, d) in enumerate(specs):
+        neighbors[:, column] = ids + (steps if kind == "single" else cascading_steps)[(i, d)]
+    return neighbors
+
+
+def expand_neighbors(n, k, nodes, fault_mask=None, return_sources=False):
+    """
+    批量邻居扩展：一次向量化调用求出一组节点的全部 (i,±1) 与 (≤i,±1) 邻居
+    每一维的 ±1 按模 k 独立回绕，(≤i,±1) 为前 i+1 维增量之和，不存在跨维进位
+
+    :param nodes: 节点编号数组
+    :param fault_mask: 故障掩码（True 表示故障），给出时只返回无故障邻居
+    :param return_sources: 为 True 时同时返回每个邻居对应的源节点
+    :return: 邻居数组（一维），或 (邻居数组, 源节点数组)
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    neighbors = _neighbor_matrix(n, k, nodes)
+    if fault_mask is None:
+        keep = np.ones(neighbors.shape, dtype=bool)
+    else:
+        keep = ~np.asarray(fault_mask, dtype=bool)[neighbors]
+    if not return_sources:
+        return neighbors[keep]
+    sources = np.broadcast_to(nodes[:, None], neighbors.shape)
+    return neighbors[keep], sources[keep]
+
+
+def generate_edge_array(n, k):
+    """
+    用下标算术和排序去重一次性生成 AQ(n,k) 的全部 (i,±1) 与 (≤i,±1) 边
+
+    :return: 形状为 (E, 2) 的整数数组，每行 (u, v) 满足 u < v，按字典序排列
+    """
+    num_nodes = k ** n
+    ids = np.arange(num_nodes, dtype=np.int64)
+    neighbors = _neighbor_matrix(n, k, ids).astype(np.int64)
+    sources = np.broadcast_to(ids[:, None], neighbors.shape)
+
+    # 图是无向的，每条边只从较小的端点取一次，以 u * V + v 编码后排序去重
+    keep = sources < neighbors
+    keys = np.sort(sources[keep] * num_nodes + neighbors[keep])
+    if keys.size:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+    edges = np.empty((keys.size, 2), dtype=_node_dtype(num_nodes))
+    edges[:, 0], edges[:, 1] = np.divmod(keys, num_nodes)
+    return edges
+
+
+def random_fault_mask(n, k, p, rng=None):
+    """
+    i.i.d. 故障场景：每个节点独立地以概率 p 故障，一次向量化生成
+
+    :param p: 节点故障概率
+    :param rng: np.random.Generator 或随机种子（None 时使用系统熵）
+    :return: 长度为 k^n 的布尔数组（True 表示故障），可直接作为 fault_mask 使用
+    """
+    rng = np.random.default_rng(rng)
+    return rng.random(k ** n) < p
+
+
+def _ball_offsets(n, k, radius):
+    """
+    AQ(n,k) 中以节点 0 为中心、半径为 radius 的球内全部节点（逐层批量扩展邻居）
+    """
+    ball = np.zeros(1, dtype=np.int64)
+    frontier = ball
+    for _ in range(radius):
+        frontier = np.setdiff1d(_neighbor_matrix(n, k, frontier), ball)
+        if frontier.size == 0:
+            break
+        ball = np.union1d(ball, frontier)
+    return ball
+
+
+def clustered_fault_mask(n, k, num_clusters, radius, rng=None):
+    """
+    空间聚集的故障场景：随机选取 num_clusters 个中心，
+    到任一中心的距离（AQ 中的最短路长度）不超过 radius 的节点均为故障
+
+    AQ(n,k) 是 Z_k^n 上的 Cayley 图，距离具有平移不变性，
+    以 c 为中心的球就是以 0 为中心的球逐维加上 c 的坐标（模 k），因此对所有中心一次向量化平移即可
+
+    :param num_clusters: 故障簇（球）的个数，中心可重复
+    :param radius: 球的半径
+    :param rng: np.random.Generator 或随机种子（None 时使用系统熵）
+    :return: 长度为 k^n 的布尔数组（True 表示故障），可直接作为 fault_mask 使用
+    """
+    rng = np.random.default_rng(rng)
+    num_nodes = k ** n
+    centers = rng.integers(0, num_nodes, size=num_clusters)
+    offsets = _ball_offsets(n, k, radius)
+
+    nodes = np.zeros((num_clusters, len(offsets)), dtype=np.int64)
+    for i in range(n):
+        weight = k ** (n - 1 - i)
+        digits = centers[:, None] // weight % k + offsets[None, :] // weight % k
+        nodes += digits % k * weight
+
+    fault_mask = np.zeros(num_nodes, dtype=bool)
+    fault_mask[nodes.reshape(-1)] = True
+    return fault_mask
+
+
+class AQTopology:
+    """
+    AQ(n,k) 的不可变拓扑，只与 (n, k) 有关，可在实例之间共享
+    CSR 邻接表和边数组在首次访问时生成，生成后均为只读数组
+    """
+
+    def __init__(self, n, k, indptr=None, indices=None, edges=None):
+        self.n = n
+        self.k = k
+        self.num_nodes = k ** n
+        self.weights = tuple(k ** (n - 1 - i) for i in range(n))  # 第i维坐标的位权
+        self.specs, self.ports = _generator_specs(n, k)
+        self._indptr = indptr
+        self._indices = indices
+        self._edges = edges
+        self._distance_oracle = None
+        self._pattern_databases = {}  # max_entries -> PatternDatabase
+
+    def _build_adjacency(self):
+        """
+        构建 CSR 邻接表，节点 v 的邻居为 indices[indptr[v]:indptr[v + 1]]
+        """
+        ids = np.arange(self.num_nodes, dtype=np.int64)
+        indices = _neighbor_matrix(self.n, self.k, ids).reshape(-1)
+        indptr = np.arange(self.num_nodes + 1, dtype=np.int64) * len(self.specs)
+        indptr.setflags(write=False)
+        indices.setflags(write=False)
+        self._indptr, self._indices = indptr, indices
+
+    @property
+    def indptr(self):
+        if self._indptr is None:
+            self._build_adjacency()
+        return self._indptr
+
+    @property
+    def indices(self):
+        if self._indices is None:
+            self._build_adjacency()
+        return self._indices
+
+    @property
+    def edges(self):
+        """
+        所有边，形状为 (E, 2) 的整数编号数组
+        """
+        if self._edges is None:
+            edges = generate_edge_array(self.n, self.k)
+            edges.setflags(write=False)
+            self._edges = edges
+        return self._edges
+
+    @property
+    def distance_oracle(self):
+        """
+        无故障 AQ(n,k) 的精确距离查询，首次访问时构建
+        """
+        if self._distance_oracle is None:
+            self._distance_oracle = DistanceOracle(self)
+        return self._distance_oracle
+
+    def pattern_database(self, max_entries=PDB_MAX_ENTRIES):
+        """
+        A* 使用的模式数据库启发式，按 max_entries 缓存
+        """
+        if max_entries not in self._pattern_databases:
+            self._pattern_databases[max_entries] = PatternDatabase(self, max_entries)
+        return self._pattern_databases[max_entries]
+
+    def neighbor_rows(self, nodes):
+        """
+        一组节点的邻居矩阵，形状为 (len(nodes), 度数)
+        已构建 CSR 邻接表时按行收集，否则用下标算术计算（不会因此构建邻接表）
+        """
+        if self._indices is None:
+            return _neighbor_matrix(self.n, self.k, np.asarray(nodes, dtype=np.int64))
+        return self._indices.reshape(self.num_nodes, len(self.specs))[nodes]
+
+    def save(self, path):
+        """
+        将邻接表和边数组保存为 .npz 文件
+        """
+        np.savez(path, n=self.n, k=self.k, indptr=self.indptr, indices=self.indices, edges=self.edges)
+
+    @classmethod
+    def load(cls, path):
+        """
+        从 .npz 文件加载拓扑
+        """
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in ("indptr", "indices", "edges")}
+            n, k = int(data["n"]), int(data["k"])
+        for array in arrays.values():
+            array.setflags(write=False)
+        return cls(n, k, **arrays)
+
+    def save_shared(self, directory):
+        """
+        将邻接表和边数组分别保存为 .npy 文件，供多个进程以内存映射方式共享
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ("indptr", "indices", "edges"):
+            np.save(_shared_topology_path(directory, self.n, self.k, name), getattr(self, name))
+
+    @classmethod
+    def attach(cls, directory, n, k):
+        """
+        以只读内存映射方式挂载 save_shared 保存的拓扑，不复制数据，多个进程共享同一份物理页
+        """
+        arrays = {name: np.load(_shared_topology_path(directory, n, k, name), mmap_mode="r")
+                  for name in ("indptr", "indices", "edges")}
+        return cls(n, k, **arrays)
+
+
+def _digit_differences(n, k, node1, node2):
+    """
+    逐维坐标差 (node2 - node1) mod k（列表，坐标 0 为最高位），
+    node1 / node2 可以是整数编号，也可以是编号数组（逐元素计算）
+    """
+    diff = [0] * n
+    for i in range(n - 1, -1, -1):
+        node1, digit1 = divmod(node1, k)
+        node2, digit2 = divmod(node2, k)
+        diff[i] = (digit2 - digit1) % k
+    return diff
+
+
+def _generator_expander(k, generators):
+    """
+    Z_k^s 上以 generators（长度为 s 的偏移向量）为生成元的 Cayley 图的邻居扩展函数，
+    供 _cayley_distances 使用（编号方式与 AugmentedKAryNCube 一致）
+    与 _neighbor_matrix 一样按每一层节点自身的坐标计算编号增量，不为全部节点预存增量数组
+    """
+    size = len(generators[0]) if generators else 0
+    weights = [k ** (size - 1 - j) for j in range(size)]
+
+    def expand(frontier):
+        digits = {}
+        steps = {}  # (维度, 偏移) -> 该维上的编号增量（按 frontier 中的节点）
+        for generator in generators:
+            step = 0
+            for j, offset in enumerate(generator):
+                if not offset:
+                    continue
+                if (j, offset) not in steps:
+                    if j not in digits:
+                        digits[j] = frontier // weights[j] % k
+                    steps[(j, offset)] = ((digits[j] + offset) % k - digits[j]) * weights[j]
+                step = step + steps[(j, offset)]
+            yield frontier + step
+    return expand
+
+
+def _cayley_distances(num_nodes, expand):
+    """
+    Cayley 图顶点传递，从原点（编号 0）出发逐层扩展即得到 dist(0, ·)，返回紧凑的距离数组
+    每层按块扩展、每次只处理一个生成元的邻居，直接在距离数组上标记去重，
+    除距离数组外的峰值内存与块大小成正比
+
+    :param num_nodes: 节点总数
+    :param expand: 邻居扩展函数，输入一层节点编号数组，逐个生成元返回邻居编号数组
+    """
+    distances = np.full(num_nodes, -1, dtype=np.int32)
+    distances[0] = 0
+    frontier = np.array([0], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        for start in range(0, frontier.size, _CAYLEY_BLOCK_SIZE):
+            for neighbors in expand(frontier[start:start + _CAYLEY_BLOCK_SIZE]):
+                distances[neighbors[distances[neighbors] < 0]] = level
+        frontier = np.flatnonzero(distances == level)
+    return distances.astype(np.uint8 if level < 256 else np.uint16)
+
+
+class PatternDatabase:
+    """
+    A* 的可采纳模式数据库启发式
+    把坐标差向量投影到若干个坐标子集（连续的维度块）上，每个子集上的生成元投影构成
+    Z_k^|S| 上的 Cayley 图，其中的最短距离是 AQ(n,k) 中距离的下界，也就不超过有故障时的真实距离
+    取各子集距离的最大值，仍然可采纳且一致；k^n 不超过 max_entries 时子集即全部坐标，启发式为精确的无故障距离
+    """
+
+    def __init__(self, topology, max_entries):
+        self.n = topology.n
+        self.k = topology.k
+        if topology.num_nodes <= max_entries:
+            block_size = self.n
+        else:
+            # 整数循环求满足 k^b <= max_entries 的最大 b（浮点对数在恰好为幂次时会向下截断）
+            block_size = 1
+            while self.k ** (block_size + 1) <= max_entries:
+                block_size += 1
+
+        self.blocks = []  # [(维度列表, 距离数组)]
+        for first in range(0, self.n, block_size):
+            dims = list(range(first, min(first + block_size, self.n)))
+            if len(dims) == self.n:
+                table = topology.distance_oracle.distances
+            else:
+                table = _cayley_distances(self.k ** len(dims),
+                                          _generator_expander(self.k, self._projected_generators(dims)))
+                table.setflags(write=False)
+            self.blocks.append((dims, table))
+
+    def _projected_generators(self, dims):
+        """
+        AQ(n,k) 的生成元在坐标子集 dims 上的投影（模 k 去重，去掉零向量）
+        """
+        specs, _ = _generator_specs(self.n, self.k)
+        generators = set()
+        for kind, i, d in specs:
+            changed = range(i + 1) if kind == "cascading" else (i,)
+            generator = tuple(d % self.k if j in changed else 0 for j in dims)
+            if any(generator):
+                generators.add(generator)
+        return sorted(generators)
+
+    def heuristic(self, node, goal):
+        """
+        node 到 goal 距离的下界：先求逐维坐标差 O(n)，再在每个子集的表中 O(1) 查找
+        """
+        k = self.k
+        diff = _digit_differences(self.n, k, node, goal)
+
+        best = 0
+        for dims, table in self.blocks:
+            index = 0
+            for j in dims:
+                index = index * k + diff[j]
+            if table[index] > best:
+                best = table[index]
+        return int(best)
+
+
+class DistanceOracle:
+    """
+    无故障 AQ(n,k) 的精确距离查询
+    AQ(n,k) 是 Z_k^n 上的 Cayley 图，在逐维模 k 平移下顶点传递，
+    因此 dist(u, v) = dist(0, (v - u) mod k)：只需从原点做一次 BFS，
+    把到所有节点的距离存成紧凑的 uint8 数组，查询时只需 O(n) 计算坐标差
+    """
+
+    def __init__(self, topology):
+        self.n = topology.n
+        self.k = topology.k
+        # 扩展直接使用拓扑的邻居模板
+        self.distances = _cayley_distances(topology.num_nodes,
+                                           lambda frontier: topology.neighbor_rows(frontier).T)
+        self.distances.setflags(write=False)
+
+    def difference(self, node1, node2):
+        """
+        坐标差 (node2 - node1) mod k 对应的节点编号（node1 / node2 也可以是编号数组）
+        """
+        index = 0
+        for digit in _digit_differences(self.n, self.k, node1, node2):
+            index = index * self.k + digit
+        return index
+
+    def distance(self, node1, node2):
+        """
+        两个节点在无故障 AQ(n,k) 中的最短距离
+        """
+        return int(self.distances[self.difference(node1, node2)])
+
+    def distance_many(self, nodes1, nodes2):
+        """
+        向量化的批量距离查询
+        """
+        nodes1 = np.asarray(nodes1, dtype=np.int64)
+        nodes2 = np.asarray(nodes2, dtype=np.int64)
+        return self.distances[self.difference(nodes1, nodes2)]
+
+
+def _shared_topology_path(directory, n, k, name):
+    """
+    共享拓扑中某个数组的文件路径
+    """
+    return os.path.join(directory, f"aq_n{n}_k{k}_{name}.npy")
+
+
+def get_topology(n, k, cache_dir=None):
+    """
+    获取 AQ(n,k) 的共享拓扑（进程内按 (n, k) 记忆化）
+
+    :param cache_dir: 可选的磁盘缓存目录，存在 aq_n{n}_k{k}.npz 时直接加载，否则构建后写入
+    """
+    key = (n, k)
+    topology = _TOPOLOGY_CACHE.get(key)
+    path = os.path.join(cache_dir, f"aq_n{n}_k{k}.npz") if cache_dir else None
+
+    if topology is None:
+        if path and os.path.exists(path):
+            topology = AQTopology.load(path)
+        else:
+            topology = AQTopology(n, k)
+        _TOPOLOGY_CACHE[key] = topology
+
+    if path and not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        topology.save(path)
+    return topology
+
+
+def attach_topology(directory, n, k):
+    """
+    挂载内存映射的共享拓扑并登记到进程内缓存；进程内已有该 (n, k) 的拓扑时直接复用
+    """
+    key = (n, k)
+    if key not in _TOPOLOGY_CACHE:
+        _TOPOLOGY_CACHE[key] = AQTopology.attach(directory, n, k)
+    return _TOPOLOGY_CACHE[key]
+
+
+def get_csr_adjacency(n, k):
+    """
+    获取 AQ(n,k) 的 CSR 邻接表（每个 (n, k) 只构建一次，结果只读共享）
+    节点 v 的邻居为 indices[indptr[v]:indptr[v + 1]]，顺序与 _generator_specs 一致
+
+    :return: (indptr, indices)
+    """
+    topology = get_topology(n, k)
+    return topology.indptr, topology.indices
 
 
 class UnionFind:
@@ -73,179 +577,1185 @@ class UnionFind:
         return components
 
 
+class ArrayUnionFind:
+    """
+    基于数组的并查集，节点为整数编号 0..size-1
+    find 为迭代的路径减半，union 按集合大小合并，并提供在边数组上批量合并的向量化入口；
+    接口与 UnionFind 保持一致，非成员节点（故障节点）的 find 返回 None
+
+    checkpoint 之后的所有修改都记录在撤销日志中，可用 rollback 撤销；
+    记录日志期间 find 不做路径压缩（按大小合并保证树高为 O(log n)）
+    """
+
+    def __init__(self, size, members=None):
+        """
+        :param size: 节点编号范围
+        :param members: 参与并查集的节点编号（或布尔掩码），None 表示全部节点
+        """
+        dtype = _node_dtype(size)
+        self.parent = np.arange(size, dtype=dtype)
+        if members is None:
+            self.member = np.ones(size, dtype=bool)
+        else:
+            members = np.asarray(members)
+            if members.dtype == bool:
+                self.member = members.copy()
+            else:
+                self.member = np.zeros(size, dtype=bool)
+                self.member[members] = True
+        # 每个根节点所在集合的大小，非根节点的值无意义
+        self.size = self.member.astype(dtype)
+        self._undo_log = None  # 撤销日志：(数组, 下标, 旧值)
+        # 可能为根的节点（当前所有根的超集），合并只会减少根，新根在产生时追加
+        self._root_candidates = [np.flatnonzero(self.member)]
+
+    @classmethod
+    def from_labels(cls, labels):
+        """
+        由连通分支标号数组构建并查集：每个分支以其最小节点编号为根，树高为 1
+
+        :param labels: 每个节点的分支编号，-1 表示非成员节点
+        """
+        labels = np.asarray(labels)
+        uf = cls(len(labels), labels >= 0)
+        nodes = np.flatnonzero(uf.member)
+        _, roots, inverse, counts = np.unique(labels[nodes], return_index=True,
+                                              return_inverse=True, return_counts=True)
+        roots = nodes[roots]
+        uf.parent[nodes] = roots[inverse]
+        uf.size[roots] = counts
+        uf._root_candidates = [roots]
+        return uf
+
+    def _set(self, array, index, value):
+        """
+        修改数组元素，记录日志期间同时保存旧值
+        """
+        if self._undo_log is not None:
+            self._undo_log.append((array, index, array[index]))
+        array[index] = value
+
+    def checkpoint(self):
+        """
+        开始（或继续）记录撤销日志，返回当前位置，供 rollback 使用
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+        return len(self._undo_log)
+
+    def rollback(self, position):
+        """
+        撤销 position 之后的全部修改
+        """
+        log = self._undo_log
+        while len(log) > position:
+            array, index, old = log.pop()
+            array[index] = old
+
+    def commit(self):
+        """
+        保留当前状态，停止记录撤销日志
+        """
+        self._undo_log = None
+
+    def find(self, node):
+        """
+        查找节点所属集合的根（迭代路径减半）
+        """
+        if not self.member[node]:
+            return None
+        parent = self.parent
+        if self._undo_log is not None:
+            while parent[node] != node:
+                node = int(parent[node])
+            return node
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = int(parent[node])
+        return node
+
+    def add(self, node):
+        """
+        将节点作为单独的集合加入并查集
+        """
+        self._set(self.member, node, True)
+        self._set(self.parent, node, node)
+        self._set(self.size, node, 1)
+        self._root_candidates.append(np.array([node]))
+
+    def union(self, node1, node2):
+        """
+        合并两个节点所属的集合（按大小合并），返回合并后的根
+        """
+        if not (self.member[node1] and self.member[node2]):
+            return None
+
+        root1 = self.find(node1)
+        root2 = self.find(node2)
+        if root1 == root2:
+            return root1
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self._set(self.parent, root2, root1)
+        self._set(self.size, root1, self.size[root1] + self.size[root2])
+        return root1
+
+    def connected(self, node1, node2):
+        """
+        检查两个节点是否连通
+        """
+        if not (self.member[node1] and self.member[node2]):
+            return False
+        return self.find(node1) == self.find(node2)
+
+    def component_size(self, node):
+        """
+        节点所在连通分支的大小，非成员节点返回 0
+        """
+        root = self.find(node)
+        return 0 if root is None else int(self.size[root])
+
+    def remove(self, nodes):
+        """
+        将一组节点移出并查集（变为非成员），调用方负责为其原分支中的其余节点重新标号
+        """
+        self._set(self.member, nodes, False)
+        self._set(self.parent, nodes, nodes)
+        self._set(self.size, nodes, 0)
+
+    def assign(self, nodes, root):
+        """
+        将一组节点直接标记为以 root 为根的同一集合（root 应在 nodes 中）
+        """
+        self._set(self.parent, nodes, root)
+        self._set(self.size, root, len(nodes))
+        self._root_candidates.append(np.array([root]))
+
+    def shrink(self, root, count):
+        """
+        以 root 为根的集合减少 count 个节点（节点已被移出或划入其他集合）
+        """
+        self._set(self.size, root, self.size[root] - count)
+
+    def flatten(self):
+        """
+        完全路径压缩：每个节点直接指向根（记录日志期间只记录发生改变的项）
+        """
+        if self._undo_log is None:
+            self._roots()
+            return
+        roots = self._roots()
+        changed = np.flatnonzero(roots != self.parent)
+        if changed.size:
+            self._set(self.parent, changed, roots[changed])
+
+    def _roots(self):
+        """
+        指针跳跃直到每个节点都直接指向根，返回压缩后的 parent 数组；
+        记录撤销日志期间不修改 parent，在副本上计算
+        """
+        parent = self.parent if self._undo_log is None else self.parent.copy()
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                return parent
+            parent[:] = grandparent
+
+    def _find_many(self, nodes):
+        """
+        向量化查找一组节点的根：只沿这些节点的 parent 链跳跃，不触及其余节点；
+        不记录日志时顺带把这些节点直接指向根
+        """
+        parent = self.parent
+        roots = parent[nodes]
+        while True:
+            next_roots = parent[roots]
+            if np.array_equal(next_roots, roots):
+                break
+            roots = next_roots
+        if self._undo_log is None:
+            parent[nodes] = roots
+        return roots
+
+    def union_edges(self, edges):
+        """
+        向量化批量合并：反复将每条边两端的根挂到较小的根下（挂接），直到所有边的两端同根
+        边数不少于节点数时在整个 parent 数组上做指针跳跃，最后统一统计集合大小；
+        否则只在本批边的端点和被挂接的根上做指针跳跃，集合大小随挂接增量更新，
+        开销与边数成正比而与节点总数无关，适合分块多次调用
+
+        :param edges: 形状为 (E, 2) 的边数组，两端都应为成员节点
+        """
+        edges = np.asarray(edges)
+        if len(edges) == 0:
+            return
+        if self._undo_log is not None:  # 记录日志期间逐条合并，保证可撤销
+            for node1, node2 in edges.tolist():
+                self.union(node1, node2)
+            return
+        u, v = edges[:, 0], edges[:, 1]
+        if len(edges) >= len(self.parent):
+            parent = self._roots()
+            while True:
+                root_u, root_v = parent[u], parent[v]
+                differ = root_u != root_v
+                if not differ.any():
+                    break
+                root_u, root_v = root_u[differ], root_v[differ]
+                # 根总是挂到编号更小的根下，不会成环
+                np.minimum.at(parent, np.maximum(root_u, root_v), np.minimum(root_u, root_v))
+                self._roots()
+                u, v = u[differ], v[differ]
+            self.size[:] = np.bincount(parent[self.member], minlength=len(parent))
+            return
+        while True:
+            root_u, root_v = self._find_many(u), self._find_many(v)
+            differ = root_u != root_v
+            if not differ.any():
+                break
+            root_u, root_v = root_u[differ], root_v[differ]
+            # 根总是挂到编号更小的根下，不会成环；同一轮中被挂接的根可能连成链
+            np.minimum.at(self.parent, np.maximum(root_u, root_v), np.minimum(root_u, root_v))
+            hooked = np.sort(np.maximum(root_u, root_v))
+            hooked = hooked[np.concatenate(([True], hooked[1:] != hooked[:-1]))]
+            hooked_sizes = self.size[hooked]
+            # 被挂接的根都不再是根，其（本轮之前的）大小累加到链末端的新根上
+            np.add.at(self.size, self._find_many(hooked), hooked_sizes)
+            u, v = u[differ], v[differ]
+
+    def labels(self):
+        """
+        每个节点所属集合的根（完全压缩后的 parent 数组），非成员节点为 -1
+        """
+        return np.where(self.member, self._roots(), -1)
+
+    def component_sizes(self):
+        """
+        各连通分支的大小：根 -> 节点数
+        """
+        roots = self.compact_roots()
+        return dict(zip(roots.tolist(), self.size[roots].tolist()))
+
+    def compact_roots(self):
+        """
+        从候选根中筛出当前的根并返回（开销与候选数成正比，而非节点总数）；
+        不记录日志时用结果替换候选列表，记录日志期间保留候选以便 rollback 后恢复的根仍在其中
+        """
+        candidates = np.sort(np.concatenate(self._root_candidates))
+        keep = self.member[candidates] & (self.parent[candidates] == candidates)
+        keep[1:] &= candidates[1:] != candidates[:-1]  # 去掉重复的候选
+        roots = candidates[keep]
+        if self._undo_log is None:
+            self._root_candidates = [roots]
+        return roots
+
+    def get_connected_components(self):
+        """
+        获取所有连通分支
+        与 UnionFind 一致：分支按其最小节点编号排列，分支内节点按编号升序
+        """
+        nodes = np.flatnonzero(self.member)
+        if nodes.size == 0:
+            return {}
+        roots = self.labels()[nodes]
+        order = np.argsort(roots, kind="stable")
+        unique_roots, starts = np.unique(roots[order], return_index=True)
+        groups = np.split(nodes[order], starts[1:])
+        first = [group[0] for group in groups]
+        return {int(unique_roots[i]): groups[i].tolist() for i in np.argsort(first, kind="stable")}
+
+
+class ComponentIndex:
+    """
+    连通分支索引：每个节点的分支编号、每个分支的成员数组和分支大小
+    分支按大小降序编号（0 为最大分支），大小相同时按最小节点编号升序，
+    与按 get_connected_components 结果稳定排序的顺序一致；分支内成员按节点编号升序
+    """
+
+    def __init__(self, roots):
+        """
+        :param roots: 每个节点所属集合的根（ArrayUnionFind.labels()），-1 表示故障节点
+        """
+        roots = np.asarray(roots)
+        nodes = np.flatnonzero(roots >= 0)
+        _, first, inverse, counts = np.unique(roots[nodes], return_index=True,
+                                              return_inverse=True, return_counts=True)
+        order = np.lexsort((nodes[first], -counts))
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        self.labels = np.full(len(roots), -1, dtype=np.int32)
+        self.labels[nodes] = rank[inverse]
+        self.sizes = counts[order]
+        # 所有成员按 (分支编号, 节点编号) 排列，分支 c 的成员为 offsets[c]:offsets[c+1] 一段
+        self._members = nodes[np.argsort(self.labels[nodes], kind="stable")]
+        self._offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def members(self, component):
+        """
+        分支的成员数组（只读切片，不复制）
+        """
+        return self._members[self._offsets[component]:self._offsets[component + 1]]
+
+    def choice(self, component):
+        """
+        从分支中随机选择一个节点（使用 random 模块，与 random.choice 在成员列表上的结果一致）
+        """
+        return int(random.choice(self.members(component)))
+
+    def sample(self, component, count):
+        """
+        从分支中随机选择 count 个不同的节点（与 random.sample 在成员列表上的结果一致）
+        """
+        members = self.members(component)
+        return [int(members[index]) for index in random.sample(range(len(members)), count)]
+
+
+class RoutingTable:
+    """
+    逐目的节点的下一跳路由表：对每个无故障的目的节点，记录同一连通分支内每个节点
+    沿最短路径走向它的第一条链路的端口号（uint8，即 _generator_specs 中的下标）
+    每个连通分支一张 (成员数, 成员数) 的表，第 i 行对应该分支中编号第 i 小的目的节点
+    """
+
+    def __init__(self, cube):
+        """
+        :param cube: AugmentedKAryNCube 实例，按其当前故障状态构建
+        """
+        if len(cube._specs) >= NO_PORT:
+            raise ValueError(f"度数 {len(cube._specs)} 超出 uint8 端口号的表示范围")
+
+        components = cube.components
+        self.fault_epoch = cube.fault_epoch
+        self.labels = components.labels
+        # 节点在所属分支成员数组中的下标，即它在分支路由表中的行号/列号
+        self.positions = np.full(cube.num_nodes, -1, dtype=np.int32)
+        self.tables = []
+        for component in range(len(components)):
+            members = components.members(component)
+            self.positions[members] = np.arange(len(members))
+            rows = cube._neighbor_rows(members)
+            table = np.empty((len(members), len(members)), dtype=np.uint8)
+            for row, destination in enumerate(members.tolist()):
+                # 以目的节点为根的BFS树中，每个节点的父节点就是它走向目的节点的下一跳
+                parent, _ = cube._bfs_tree(destination)
+                next_hops = parent[members]
+                has_hop = next_hops >= 0
+                table[row] = NO_PORT
+                if has_hop.any():
+                    table[row, has_hop] = (rows[has_hop] == next_hops[has_hop, None]).argmax(axis=1)
+            self.tables.append(table)
+
+    @property
+    def nbytes(self):
+        """
+        路由表占用的内存（字节）
+        """
+        return sum(table.nbytes for table in self.tables) + self.labels.nbytes + self.positions.nbytes
+
+    def next_hop(self, node, destination):
+        """
+        node 走向 destination 的端口号；destination 为 node 自身时为 NO_PORT，
+        两者不在同一分支（或有故障节点）时返回 None
+        """
+        component = self.labels[node]
+        if component < 0 or component != self.labels[destination]:
+            return None
+        return int(self.tables[component][self.positions[destination], self.positions[node]])
+
+
+class PackedFaultBits:
+    """
+    按位压缩存储的节点故障状态（每个节点 1 bit），用于超大规模的立方体
+    与 bytearray 一样支持 bits[node] 读写，读出 1 表示故障
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._bytes = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, node):
+        return (self._bytes[node >> 3] >> (node & 7)) & 1
+
+    def __setitem__(self, node, value):
+        if value:
+            self._bytes[node >> 3] |= 1 << (node & 7)
+        else:
+            self._bytes[node >> 3] &= ~(1 << (node & 7)) & 0xFF
+
+    def to_mask(self):
+        """
+        解包为 NumPy 布尔数组（True 表示故障）
+        """
+        bits = np.unpackbits(np.frombuffer(self._bytes, dtype=np.uint8), bitorder="little")
+        return bits[:self.size].view(bool)
+
+    def set_mask(self, mask):
+        """
+        用 NumPy 布尔数组整体覆盖故障状态
+        """
+        self._bytes[:] = np.packbits(np.asarray(mask, dtype=bool), bitorder="little").tobytes()
+
+
+class NodeStateView(Mapping):
+    """
+    node_states 的只读字典视图：节点（对外表示） -> "fault-free" 或 "faulty"
+    实际状态存放在 AugmentedKAryNCube.faulty 中
+    """
+
+    def __init__(self, cube):
+        self._cube = cube
+
+    def __getitem__(self, node):
+        node_id = self._cube._to_id(node)
+        if not 0 <= node_id < self._cube.num_nodes:
+            raise KeyError(node)
+        return "faulty" if self._cube.faulty[node_id] else "fault-free"
+
+    def __iter__(self):
+        for node_id in range(self._cube.num_nodes):
+            yield self._cube._to_api(node_id)
+
+    def __len__(self):
+        return self._cube.num_nodes
+
+
 class AugmentedKAryNCube:
-    def __init__(self, n, k, r, h = 0):
+    _EXPAND_BLOCK_SIZE = 1 << 16  # 批量邻居扩展每块的节点数
+    # 方向优化BFS的切换阈值：当前层规模超过未访问节点数的 1/ALPHA 时转为自底向上，
+    # 小于节点总数的 1/BETA 时转回自顶向下
+    _BFS_ALPHA = 14
+    _BFS_BETA = 24
+
+    def __init__(self, n, k, r, h = 0, int_ids=False, implicit=False, packed_faults=False,
+                 topology_cache_dir=None, fault_mask=None, build_union_find=True, uf_backend="union_find",
+                 sssp_cache_bytes=0, path_cache_size=0, fast_faults=False):
         """
         初始化 Augmented k-ary n-cube
 
+        内部统一使用整数节点编号（坐标向量的混合基数秩，与 product 的枚举顺序一致），
+        元组只在对外接口处编码/解码
+
         :param n: 维度
         :param k: 基数
         :param r: 分支个数
         :param h: 分支中包含的最少节点数
+        :param int_ids: 为 True 时对外接口也直接使用整数节点编号，否则使用坐标元组
+        :param implicit: 隐式拓扑模式，不构建 CSR 邻接表，邻居按需计算，只存储节点故障状态
+        :param packed_faults: 故障状态按位压缩存储（每节点 1 bit），否则每节点 1 字节
+        :param topology_cache_dir: 可选的拓扑磁盘缓存目录（.npz），隐式模式下忽略
+        :param fault_mask: 给定的故障掩码（True 表示故障），给出时不再随机生成故障；
+                           只读的内存映射数组直接共享，不复制
+        :param build_union_find: 为 False 时并查集推迟到首次访问 uf 时构建
+        :param uf_backend: 并查集的构建方式，"union_find" 为在边数组上批量合并，
+                           "csgraph" 为由 scipy.sparse.csgraph 的连通分支标号生成
+        :param sssp_cache_bytes: 单源最短路径树缓存的内存上限（字节），为 0 时不缓存
+        :param path_cache_size: 路径查询 LRU 缓存的最大条目数，为 0 时不缓存
+        :param fast_faults: 为 True 时用增量候选池生成故障（set_node_states(fast=True)），
+                            适合很大的 r；同一随机种子下生成的故障与默认方式不同
         """
         self.n = n
         self.k = k
         self.r = r
         self.h = h
-        self.nodes = list(product(range(k), repeat=n))  # 所有节点
-        self.edges = self._generate_edges()  # 所有边
-        self.node_states = {}  # 节点状态：fault-free 或 faulty
-
-        self.set_node_states()
-        self._build_union_find()
-
-    def _generate_edges(self):
-        """
-        生成所有边
-        """
-        edges = set()
-        for node in self.nodes:
-            for i in range(self.n):
-                # (i, ±1)-边
-                neighbor_plus = self._get_neighbor(node, i, +1)
-                neighbor_minus = self._get_neighbor(node, i, -1)
-                if neighbor_plus:
-                    edges.add(tuple(sorted([node, neighbor_plus])))
-                if neighbor_minus:
-                    edges.add(tuple(sorted([node, neighbor_minus])))
-            for i in range(1, self.n):
-                # (≤i, ±1)-边
-                neighbor_plus = self._get_cascading_neighbor(node, i, +1)
-                neighbor_minus = self._get_cascading_neighbor(node, i, -1)
-                if neighbor_plus:
-                    edges.add(tuple(sorted([node, neighbor_plus])))
-                if neighbor_minus:
-                    edges.add(tuple(sorted([node, neighbor_minus])))
-        return list(edges)
+        self.int_ids = int_ids
+        self.implicit = implicit
+        self.uf_backend = uf_backend
+        self.num_nodes = k ** n  # 节点总数
+        self._nodes = None  # 所有节点，首次访问 self.nodes 时生成
+        # 同一 (n, k) 的实例共享的拓扑：位权、生成元及其端口号、CSR 邻接表、边数组
+        self.topology = get_topology(n, k, None if implicit else topology_cache_dir)
+        self._weights = self.topology.weights  # 第i维坐标的位权
+        self._specs, self._ports = self.topology.specs, self.topology.ports
+        # CSR 邻接表，隐式模式下不构建
+        if implicit:
+            self.adjacency_indptr = self.adjacency_indices = None
+        else:
+            self.adjacency_indptr = self.topology.indptr
+            self.adjacency_indices = self.topology.indices
+        # 节点故障状态，按整数编号索引，1 表示故障
+        # 故障状态版本号：故障状态每次改变时从单调递增的计数器取一个新值，
+        # rollback 恢复检查点时的版本号，因此同一版本号不会对应两种不同的故障状态
+        self.fault_epoch = 0
+        self._epoch_counter = 0
+        # 单源最短路径树缓存：(源节点, fault_epoch) -> (距离数组, 父节点数组)，按 LRU 淘汰
+        self.sssp_cache_bytes = sssp_cache_bytes
+        self._sssp_cache = OrderedDict()
+        self._sssp_cache_used = 0
+        # 路径查询缓存：(算法, 起点, 终点) -> 查询结果，按 LRU 淘汰，fault_epoch 改变时清空
+        self.path_cache_size = path_cache_size
+        self._path_cache = OrderedDict()
+        self._path_cache_epoch = self.fault_epoch
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        self.routing_table = None  # 下一跳路由表，由 build_routing_table 构建
+        self.routing_build_time = None
+        self.node_states = NodeStateView(self)  # 兼容旧接口的只读视图：fault-free 或 faulty
+        if fault_mask is None:
+            self.faulty = PackedFaultBits(self.num_nodes) if packed_faults else bytearray(self.num_nodes)
+            self.set_node_states(fast=fast_faults)
+        else:
+            self.faulty = self._fault_storage(fault_mask, packed_faults)
+
+        self._uf = None
+        self._components = None  # 连通分支索引，随并查集一起失效
+        self.uf_build_time = None
+        self._fault_log = None  # checkpoint 之后的故障状态修改：(节点编号数组, 修改前是否故障)
+        if build_union_find:
+            self._build_union_find()
+
+    @staticmethod
+    def _fault_storage(fault_mask, packed_faults=False):
+        """
+        由故障掩码生成故障状态存储：压缩位图、只读共享的内存视图或 bytearray 副本
+        只读内存视图在首次修改故障状态时由 _writable_faults 复制为私有的 bytearray（写时复制）
+        """
+        if packed_faults:
+            faulty = PackedFaultBits(len(fault_mask))
+            faulty.set_mask(fault_mask)
+            return faulty
+        if isinstance(fault_mask, np.memmap) and not fault_mask.flags.writeable:
+            return memoryview(fault_mask.view(np.uint8))
+        return bytearray(np.asarray(fault_mask, dtype=bool).tobytes())
+
+    def set_fault_mask(self, fault_mask):
+        """
+        整体替换故障状态（例如 random_fault_mask / clustered_fault_mask 生成的场景），
+        fault_epoch 更新，撤销日志作废；并查集已构建时按新的故障状态重建
+
+        :param fault_mask: 长度为节点总数的布尔数组（True 表示故障）
+        """
+        if len(fault_mask) != self.num_nodes:
+            raise ValueError(f"故障掩码长度 {len(fault_mask)} 与节点总数 {self.num_nodes} 不一致")
+
+        self.faulty = self._fault_storage(fault_mask, isinstance(self.faulty, PackedFaultBits))
+        self._next_fault_epoch()
+        self._fault_log = None
+        self._components = None
+        if self._uf is not None:
+            self._build_union_find()
+
+    def save_shared(self, directory):
+        """
+        将邻接表、边数组和故障掩码保存到目录，供其他进程通过 attach 以内存映射方式共享
+        """
+        self.topology.save_shared(directory)
+        np.save(os.path.join(directory, "faulty.npy"), self.fault_mask)
+        with open(os.path.join(directory, "meta.json"), "w") as file:
+            json.dump({"n": self.n, "k": self.k, "r": self.r, "h": self.h}, file)
+
+    @classmethod
+    def attach(cls, directory, int_ids=False):
+        """
+        挂载 save_shared 保存的拓扑和故障掩码（只读内存映射），
+        多个进程共享同一份物理页，并查集推迟到首次使用时构建；
+        fail_nodes / repair_nodes / set_node_states 首次修改故障状态时复制出私有副本
+        """
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+        attach_topology(directory, meta["n"], meta["k"])
+        fault_mask = np.load(os.path.join(directory, "faulty.npy"), mmap_mode="r")
+        return cls(meta["n"], meta["k"], meta["r"], meta["h"], int_ids=int_ids,
+                   fault_mask=fault_mask, build_union_find=False)
+
+    def encode_node(self, node):
+        """
+        将坐标元组编码为整数节点编号
+        """
+        node_id = 0
+        for digit in node:
+            node_id = node_id * self.k + digit
+        return node_id
+
+    def decode_node(self, node_id):
+        """
+        将整数节点编号解码为坐标元组
+        """
+        return tuple(self._digits(node_id))
+
+    def _digits(self, node_id):
+        """
+        获取整数节点编号的各维坐标（列表）
+        """
+        digits = [0] * self.n
+        for i in range(self.n - 1, -1, -1):
+            node_id, digits[i] = divmod(node_id, self.k)
+        return digits
+
+    def _to_id(self, node):
+        """
+        对外接口 -> 内部：接受坐标元组或整数编号，统一转换为整数编号
+        """
+        if isinstance(node, (tuple, list)):
+            return self.encode_node(node)
+        return int(node)
+
+    def _to_ids(self, nodes):
+        """
+        一组节点 -> 整数编号数组：接受形状为 (m, n) 的坐标数组或形状为 (m,) 的编号数组
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if nodes.ndim == 2:
+            return nodes @ np.array(self._weights, dtype=np.int64)
+        return nodes
+
+    def _to_api(self, node_id):
+        """
+        内部 -> 对外接口：按 int_ids 模式返回整数编号或坐标元组
+        """
+        return node_id if self.int_ids else self.decode_node(node_id)
+
+    def _path_to_api(self, path):
+        """
+        将整数编号路径转换为对外表示
+        """
+        if self.int_ids:
+            return path
+        return [self.decode_node(node_id) for node_id in path]
+
+    @property
+    def nodes(self):
+        """
+        所有节点（对外表示），首次访问时才生成
+        """
+        if self._nodes is None:
+            if self.int_ids:
+                self._nodes = list(range(self.num_nodes))
+            else:
+                self._nodes = list(product(range(self.k), repeat=self.n))
+        return self._nodes
+
+    @property
+    def edges(self):
+        """
+        所有边，形状为 (E, 2) 的整数编号数组，首次访问时才生成（同一 (n, k) 的实例共享）
+        """
+        return self.topology.edges
+
+    @property
+    def fault_mask(self):
+        """
+        节点故障状态的 NumPy 布尔数组（True 表示故障）
+        非压缩存储时为 faulty 的零拷贝视图，压缩存储时为解包后的副本
+        """
+        if isinstance(self.faulty, PackedFaultBits):
+            return self.faulty.to_mask()
+        return np.frombuffer(self.faulty, dtype=bool)
 
     def _get_neighbor(self, node, i, direction):
         """
-        获取 (i, ±1) 邻居
+        获取 (i, ±1) 邻居（整数编号，查 CSR 邻接表）
         """
-        new_node = list(node)
-        new_node[i] = (new_node[i] + direction) % self.k
-        return tuple(new_node)
+        if self.adjacency_indices is None:
+            weight = self._weights[i]
+            digit = node // weight % self.k
+            return node + ((digit + direction) % self.k - digit) * weight
+        port = self._ports.get(("single", i, direction))
+        if port is None:  # k=1 时为自环
+            return node
+        return int(self.adjacency_indices[self.adjacency_indptr[node] + port])
 
     def _get_cascading_neighbor(self, node, i, direction):
         """
-        获取 (≤i, ±1) 邻居
+        获取 (≤i, ±1) 邻居（整数编号，查 CSR 邻接表）
+        """
+        if self.adjacency_indices is None:
+            new_node = node
+            for j in range(i + 1):
+                weight = self._weights[j]
+                digit = node // weight % self.k
+                new_node += ((digit + direction) % self.k - digit) * weight
+            return new_node
+        kind = "cascading" if i >= 1 else "single"  # (≤0, ±1) 即 (0, ±1)
+        port = self._ports.get((kind, i, direction))
+        if port is None:
+            return node
+        return int(self.adjacency_indices[self.adjacency_indptr[node] + port])
+
+    def _neighbor_ids(self, node):
+        """
+        获取节点的全部邻居（整数编号，不区分故障状态，已去重）
+        顺序：(0,-1), (0,+1), ..., (n-1,+1), (≤1,-1), (≤1,+1), ..., (≤n-1,+1)
         """
-        new_node = list(node)
-        for j in range(i + 1):
-            new_node[j] = (new_node[j] + direction) % self.k
-        return tuple(new_node)
+        if self.adjacency_indices is None:
+            return self._implicit_neighbor_ids(node)
+        return self.adjacency_indices[self.adjacency_indptr[node]:self.adjacency_indptr[node + 1]].tolist()
 
-    def set_node_states(self):
+    def _implicit_neighbor_ids(self, node):
+        """
+        隐式模式下按坐标算术计算节点的全部邻居，顺序与 CSR 邻接表一致
+        """
+        k = self.k
+        digits = self._digits(node)
+        steps = {}
+        cascading_steps = {}
+        minus = plus = 0
+        for i in range(self.n):
+            weight = self._weights[i]
+            digit = digits[i]
+            steps[(i, -1)] = ((digit - 1) % k - digit) * weight
+            steps[(i, 1)] = ((digit + 1) % k - digit) * weight
+            minus += steps[(i, -1)]
+            plus += steps[(i, 1)]
+            cascading_steps[(i, -1)] = minus
+            cascading_steps[(i, 1)] = plus
+        return [node + (steps if kind == "single" else cascading_steps)[(i, d)]
+                for kind, i, d in self._specs]
+
+    def set_node_states(self, fast=False):
         """
         生成r-1个独立分支，每个分支包含h+1个无故障节点，
         并将这些节点的所有邻居设为故障节点
+
+        :param fast: 为 True 时用增量候选池选择种子节点（_pooled_seeds），每个分支的代价与 V 无关
         """
         # 初始化所有节点为无故障
-        for node in self.nodes:
-            self.node_states[node] = "fault-free"
+        self._next_fault_epoch()
+        faulty = self._writable_faults()
+        if isinstance(faulty, PackedFaultBits):
+            faulty.set_mask(np.zeros(self.num_nodes, dtype=bool))
+        else:
+            faulty[:] = bytes(self.num_nodes)
 
-        # 存储已使用的核心节点
-        used_cores = set()
+        # 压缩存储时在解包的副本上标记，最后一次写回
+        fault_mask = self.fault_mask
+        used = np.zeros(self.num_nodes, dtype=bool)  # 已使用的核心节点
+        available_count = self.num_nodes  # 无故障且未作核心的节点数
+        seeds = self._pooled_seeds(fault_mask, used) if fast else self._uniform_seeds(fault_mask, used)
         generated_branches = 0
 
         # 生成r-1个分支
         for _ in range(self.r - 1):
-            # 获取可用无故障节点（排除已用核心节点）
-            available_nodes = [n for n in self.nodes
-                               if self.node_states[n] == "fault-free"
-                               and n not in used_cores]
-
             # 终止条件检查
-            if len(available_nodes) < self.h + 1:
+            if available_count < self.h + 1:
                 break
 
-            # 随机选择种子节点
-            start_node = random.choice(available_nodes)
-
-            # BFS收集连通节点形成核心
-            core = []
-            queue = deque([start_node])
-            visited = set()
-
-            while queue and len(core) < self.h + 1:
-                current = queue.popleft()
-                if current in visited:
-                    continue
-                visited.add(current)
-                core.append(current)
-                used_cores.add(current)
-
-                # 获取有效邻居
-                neighbors = []
-                # 单维邻居
-                for i in range(self.n):
-                    for d in [-1, 1]:
-                        neighbor = self._get_neighbor(current, i, d)
-                        if (self.node_states[neighbor] == "fault-free" and
-                                neighbor not in used_cores):
-                            neighbors.append(neighbor)
-                # 多维邻居
-                for i in range(1, self.n):
-                    for d in [-1, 1]:
-                        neighbor = self._get_cascading_neighbor(current, i, d)
-                        if (self.node_states[neighbor] == "fault-free" and
-                                neighbor not in used_cores):
-                            neighbors.append(neighbor)
-
-                # 添加未访问邻居到队列
-                queue.extend([n for n in neighbors if n not in visited])
-
-            # 有效性检查
-            if len(core) < self.h + 1:
-                # 回滚已标记的核心节点
-                for n in core:
-                    used_cores.remove(n)
+            # 随机选择种子节点，BFS收集连通节点形成核心
+            core = self._grow_core(next(seeds), fault_mask, used)
+            if core is None:
                 continue
 
             # 标记边界节点为故障
-            fault_candidates = set()
-            for node in core:
-                # 单维边界
-                for i in range(self.n):
-                    for d in [-1, 1]:
-                        neighbor = self._get_neighbor(node, i, d)
-                        if neighbor not in core:
-                            fault_candidates.add(neighbor)
-                # 多维边界
-                for i in range(1, self.n):
-                    for d in [-1, 1]:
-                        neighbor = self._get_cascading_neighbor(node, i, d)
-                        if neighbor not in core:
-                            fault_candidates.add(neighbor)
-
-            # 设置故障状态
-            for n in fault_candidates:
-                if self.node_states[n] == "fault-free":
-                    self.node_states[n] = "faulty"
+            boundary = self._core_boundary(core, fault_mask)
+            fault_mask[boundary] = True
+            available_count -= len(core) + len(boundary)
 
             generated_branches += 1
 
+        if isinstance(faulty, PackedFaultBits):
+            faulty.set_mask(fault_mask)
+
         # 最终有效性验证
         if generated_branches < self.r - 1:
             print(f"警告：仅生成{generated_branches}个分支，目标{self.r - 1}个")
 
+    @staticmethod
+    def _uniform_seeds(fault_mask, used):
+        """
+        种子节点：每次从全部无故障且未作核心的节点中均匀随机选择（每个分支 O(V)）
+        """
+        while True:
+            yield int(random.choice(np.flatnonzero(~(fault_mask | used))))
+
+    @staticmethod
+    def _pooled_seeds(fault_mask, used):
+        """
+        种子节点（增量候选池）：候选池为全部节点的数组，随机抽取时遇到已故障或已作核心的节点
+        就与池尾交换后删除（惰性删除），均摊每次抽取 O(1)，不必每个分支都重建可用节点列表
+        """
+        pool = np.arange(len(fault_mask), dtype=_node_dtype(len(fault_mask)))
+        pool_size = len(pool)
+        while True:
+            index = random.randrange(pool_size)
+            node = int(pool[index])
+            if not (fault_mask[node] or used[node]):
+                yield node
+                continue
+            pool_size -= 1
+            pool[index] = pool[pool_size]
+
+    def _grow_core(self, start_node, fault_mask, used):
+        """
+        从种子节点出发 BFS 收集 h+1 个连通的无故障节点作为核心，并在 used 中标记；
+        不足 h+1 个时回滚已标记的核心节点，返回 None
+
+        :return: 核心节点编号数组或 None
+        """
+        core = []
+        queue = deque([start_node])
+        visited = set()
+
+        while queue and len(core) < self.h + 1:
+            current = queue.popleft()
+            if current in visited:
+                continue
+            visited.add(current)
+            core.append(current)
+            used[current] = True
+
+            # 添加未访问的有效邻居到队列
+            queue.extend([neighbor for neighbor in self._neighbor_ids(current)
+                          if not (fault_mask[neighbor] or used[neighbor])
+                          and neighbor not in visited])
+
+        # 有效性检查
+        if len(core) < self.h + 1:
+            used[core] = False
+            return None
+        return np.array(core, dtype=np.int64)
+
+    def _core_boundary(self, core, fault_mask):
+        """
+        核心的边界：用 AQ 的邻居模板（expand_neighbors）对核心做一次向量化膨胀，
+        返回尚未故障的非核心邻居
+        """
+        return np.setdiff1d(expand_neighbors(self.n, self.k, core, fault_mask), core)
+
+    def _next_fault_epoch(self):
+        """
+        故障状态改变时分配新的版本号
+        """
+        self._epoch_counter += 1
+        self.fault_epoch = self._epoch_counter
+
+    def _writable_faults(self):
+        """
+        返回可写的故障状态存储：attach 挂载的只读共享内存视图在首次写入前复制为私有的
+        bytearray（写时复制），其他进程看到的共享故障掩码不受影响
+        """
+        if isinstance(self.faulty, memoryview) and self.faulty.readonly:
+            self.faulty = bytearray(self.faulty)
+        return self.faulty
+
+    def _mark_faulty(self, nodes):
+        """
+        将一组节点（编号数组）标记为故障
+        """
+        self._next_fault_epoch()
+        faulty = self._writable_faults()
+        if isinstance(faulty, PackedFaultBits):
+            for node in nodes.tolist():
+                faulty[node] = 1
+        else:
+            self.fault_mask[nodes] = True
+
+    def _mark_fault_free(self, nodes):
+        """
+        将一组节点（编号数组）标记为无故障
+        """
+        self._next_fault_epoch()
+        faulty = self._writable_faults()
+        if isinstance(faulty, PackedFaultBits):
+            for node in nodes.tolist():
+                faulty[node] = 0
+        else:
+            self.fault_mask[nodes] = False
+
+    @property
+    def uf(self):
+        """
+        无故障节点的并查集，未构建时在首次访问时构建
+        """
+        if self._uf is None:
+            self._build_union_find()
+        return self._uf
+
     def _build_union_find(self):
         """
         构建并查集
         只考虑无故障节点
         """
         start_time = time.time()  # 记录开始时间
-        fault_free_nodes = [node for node, state in self.node_states.items()
-                            if state == "fault-free"]
-        self.uf = UnionFind(fault_free_nodes)
-
-        for node1, node2 in self.edges:
-            if (self.node_states[node1] == "fault-free" and
-                    self.node_states[node2] == "fault-free"):
-                self.uf.union(node1, node2)
+        fault_free = ~self.fault_mask
+
+        if self.uf_backend == "csgraph":
+            labels, _ = self.label_components()
+            self._uf = ArrayUnionFind.from_labels(labels)
+        elif self.uf_backend != "union_find":
+            raise ValueError(f"未知并查集构建方式: {self.uf_backend}")
+        elif self.implicit:
+            self._uf = ArrayUnionFind(self.num_nodes, fault_free)
+            # 隐式模式：分块批量扩展无故障邻居，不依赖完整的边列表
+            fault_mask = ~fault_free
+            nodes = np.flatnonzero(fault_free)
+            for block_start in range(0, len(nodes), self._EXPAND_BLOCK_SIZE):
+                block = nodes[block_start:block_start + self._EXPAND_BLOCK_SIZE]
+                neighbors, sources = expand_neighbors(self.n, self.k, block, fault_mask,
+                                                      return_sources=True)
+                keep = sources < neighbors  # 每条边只合并一次
+                self._uf.union_edges(np.stack([sources[keep], neighbors[keep]], axis=1))
+            self._uf.compact_roots()
+        else:
+            # 直接在边数组上筛选两端均无故障的边，批量合并
+            self._uf = ArrayUnionFind(self.num_nodes, fault_free)
+            edges = self.edges
+            self._uf.union_edges(edges[fault_free[edges[:, 0]] & fault_free[edges[:, 1]]])
+            self._uf.compact_roots()
+        self._components = None
         end_time = time.time()  # 记录结束时间
         self.uf_build_time = end_time - start_time  # 计算构建时间
 
+    @property
+    def components(self):
+        """
+        连通分支索引（ComponentIndex），故障状态改变后在首次访问时重建
+        """
+        if self._components is None:
+            self._components = ComponentIndex(self.uf.labels())
+        return self._components
+
+    def label_components(self):
+        """
+        用 scipy.sparse.csgraph.connected_components 对无故障节点的导出子图做连通分支标号，
+        作为并查集之外的（C 实现的）另一种连通分支计算方式；隐式模式下临时生成邻接表
+
+        :return: (labels, sizes)：labels 为每个节点的分支编号（int32，故障节点为 -1），
+                 sizes[c] 为分支 c 的节点数
+        """
+        num_nodes = self.num_nodes
+        fault_free = ~self.fault_mask
+        if self.adjacency_indices is None:
+            indices = self._neighbor_rows(np.arange(num_nodes, dtype=np.int64)).reshape(-1)
+        else:
+            indices = self.adjacency_indices
+
+        # 度数均匀，逐行保留两端均无故障的邻接项
+        degree = len(self._specs)
+        keep = (fault_free[indices].reshape(num_nodes, degree)) & fault_free[:, None]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        keep = keep.reshape(-1)
+        graph = csr_matrix((np.ones(indptr[-1], dtype=np.int8), indices[keep], indptr),
+                           shape=(num_nodes, num_nodes))
+        _, raw_labels = connected_components(graph, directed=False)
+
+        # 故障节点在导出子图中是孤立点，去掉后把分支编号压缩为 0..C-1
+        labels = np.full(num_nodes, -1, dtype=np.int32)
+        _, labels[fault_free], sizes = np.unique(raw_labels[fault_free], return_inverse=True,
+                                                 return_counts=True)
+        return labels, sizes
+
+    def fail_nodes(self, nodes):
+        """
+        运行时将一组节点标记为故障，并局部更新连通分支：
+        只对失效节点原先所在的分支重新标号，搜索范围限于这些分支，不重建整个并查集
+
+        :param nodes: 要标记为故障的节点
+        :return: 本次新失效的节点数
+        """
+        failed = np.unique(np.fromiter((self._to_id(node) for node in nodes), dtype=np.int64))
+        failed = failed[~self.fault_mask[failed]]
+        if failed.size == 0:
+            return 0
+
+        if self._fault_log is not None:
+            self._fault_log.append((failed, False))
+        self._mark_faulty(failed)
+        if self._uf is not None:  # 并查集尚未构建时，首次访问会按新的故障状态构建
+            uf = self._uf
+            uf.flatten()  # 每个节点直接指向根，保留原标号的部分不会经过失效节点
+            failed_roots = uf.parent[failed]
+            uf.remove(failed)
+
+            # 原分支中剩余的节点都能从失效节点的某个无故障邻居出发搜到
+            fault_mask = self.fault_mask
+            seeds = np.unique(self._neighbor_rows(failed))
+            seeds = seeds[~fault_mask[seeds]]
+            seed_roots = uf.parent[seeds]
+            visited = fault_mask.copy()  # 故障节点视为已访问
+            owner = np.full(self.num_nodes, -1, dtype=np.int64)
+            for root in np.unique(seed_roots).tolist():
+                removed = int(np.count_nonzero(failed_roots == root))
+                self._split_component(root, seeds[seed_roots == root], removed, visited, owner)
+            self._components = None
+        return len(failed)
+
+    @staticmethod
+    def _first_visits(nodes, visited, slot):
+        """
+        取出 nodes 中未访问的节点并标记为已访问，用 slot 数组散射去重（不排序）
+
+        :param slot: 长度为节点总数的整数数组，用作去重的临时空间
+        :return: (去重后的新节点数组, 它们在 nodes 中的位置)
+        """
+        index = np.flatnonzero(~visited[nodes])
+        new = nodes[index]
+        positions = np.arange(len(new))
+        slot[new] = positions
+        first = slot[new] == positions
+        visited[new] = True
+        return new[first], index[first]
+
+    def _split_component(self, root, seeds, removed, visited, owner):
+        """
+        检测失效节点移除后根为 root 的原分支是否断开（"搜索较小一侧"）：
+        从各种子（失效节点的无故障邻居）同时逐层搜索，相遇的搜索合并为一组；
+        某组的层变为空时说明它已搜完一个独立的部分，重新标号为新的分支。
+        只剩一个组仍在扩展时停止，该组所在的（最大的）部分保留原有标号，不必搜索完毕
+
+        :param removed: 原分支中失效的节点数
+        :param visited: 已访问掩码（故障节点为 True），各分支共用
+        :param owner: 节点 -> 发现它的种子下标，各分支共用
+        """
+        uf = self._uf
+        groups = list(range(len(seeds)))  # 种子下标 -> 所在组（小型并查集）
+
+        def find_group(search):
+            while groups[search] != search:
+                groups[search] = groups[groups[search]]
+                search = groups[search]
+            return search
+
+        visited[seeds] = True
+        owner[seeds] = np.arange(len(seeds))
+        frontier = seeds
+        discovered = [seeds]
+        while True:
+            group_of = np.array([find_group(search) for search in range(len(seeds))])
+            active = np.unique(group_of[owner[frontier]])
+            if len(active) <= 1:
+                break
+
+            neighbors, sources = self._expand_frontier(frontier)
+            # 邻居已被其他组访问（含本层同时发现）时两组相遇，合并
+            frontier, index = self._first_visits(neighbors, visited, owner)
+            owner[frontier] = owner[sources[index]]
+            met = owner[neighbors] >= 0
+            source_groups = group_of[owner[sources[met]]]
+            neighbor_groups = group_of[owner[neighbors[met]]]
+            differ = source_groups != neighbor_groups
+            for group1, group2 in set(zip(source_groups[differ].tolist(), neighbor_groups[differ].tolist())):
+                group1, group2 = find_group(group1), find_group(group2)
+                if group1 != group2:
+                    groups[group2] = group1
+            discovered.append(frontier)
+
+        # 已停止扩展的组各自是一个完整的新分支
+        nodes = np.concatenate(discovered)
+        node_groups = group_of[owner[nodes]]
+        kept = active[0] if len(active) else None
+        root_moved = not uf.member[root]
+        split_size = 0
+        for group in np.unique(node_groups).tolist():
+            if group == kept:
+                continue
+            members = nodes[node_groups == group]
+            root_moved = root_moved or bool(np.any(members == root))
+            uf.assign(members, int(members[0]))
+            split_size += len(members)
+
+        if kept is None:
+            return
+        if root_moved:
+            # 原来的根已失效或落在断开的部分中（少见），剩余部分需要完整地重新标号
+            self._relabel_from(seeds[[kept]])
+        else:
+            uf.shrink(root, removed + split_size)
+
+    def repair_nodes(self, nodes):
+        """
+        运行时将一组故障节点修复为无故障，并增量合并连通分支：
+        每个修复的节点与其无故障邻居所在的分支合并
+
+        :param nodes: 要修复的节点
+        :return: 本次修复的节点数
+        """
+        repaired = sorted({node_id for node_id in map(self._to_id, nodes) if self.faulty[node_id]})
+        if not repaired:
+            return 0
+
+        repaired = np.array(repaired, dtype=np.int64)
+        if self._fault_log is not None:
+            self._fault_log.append((repaired, True))
+        self._mark_fault_free(repaired)
+        if self._uf is not None:
+            for node in repaired.tolist():
+                self._uf.add(node)
+                for neighbor in self._neighbor_ids(node):
+                    if not self.faulty[neighbor]:
+                        self._uf.union(node, neighbor)
+            self._components = None
+        return len(repaired)
+
+    def checkpoint(self):
+        """
+        建立检查点：之后的 fail_nodes / repair_nodes 都可以用 rollback 撤销
+
+        :return: 检查点标记
+        """
+        if self._fault_log is None:
+            self._fault_log = []
+        return len(self._fault_log), self.uf.checkpoint(), self.fault_epoch, self._components
+
+    def rollback(self, marker):
+        """
+        撤销检查点之后的故障状态与连通分支修改；
+        故障状态与检查点时完全相同，因此恢复当时的 fault_epoch 与连通分支索引，各类缓存仍然有效
+
+        :param marker: checkpoint 返回的标记
+        """
+        fault_position, uf_position, fault_epoch, components = marker
+        while len(self._fault_log) > fault_position:
+            nodes, was_faulty = self._fault_log.pop()
+            if was_faulty:
+                self._mark_faulty(nodes)
+            else:
+                self._mark_fault_free(nodes)
+        self._uf.rollback(uf_position)
+        self.fault_epoch = fault_epoch
+        self._components = components
+
+    def commit(self):
+        """
+        保留检查点之后的修改，停止记录撤销日志
+        """
+        self._fault_log = None
+        if self._uf is not None:
+            self._uf.commit()
+
+    def evaluate_repairs(self, candidates):
+        """
+        what-if 分析：逐个试探修复候选节点并立即回滚，
+        每次试探只需 O(度数) 次 find/union，不重建并查集
+
+        :param candidates: 候选故障节点
+        :return: 字典：候选节点 -> 修复后该节点所在连通分支的节点数，按节点数降序排列
+        """
+        logging = self._fault_log is not None
+        results = {}
+        for node in candidates:
+            marker = self.checkpoint()
+            self.repair_nodes([node])
+            results[node] = self.uf.component_size(self._to_id(node))
+            self.rollback(marker)
+        if not logging:
+            self.commit()
+        return dict(sorted(results.items(), key=lambda item: item[1], reverse=True))
+
+    def _relabel_from(self, seeds):
+        """
+        从各种子节点出发做BFS，把每次搜到的无故障区域重新标号为一个连通分支（以种子为根）
+        """
+        visited = self.fault_mask.copy()  # 故障节点视为已访问
+        slot = np.empty(self.num_nodes, dtype=np.int64)
+        for seed in seeds.tolist():
+            if visited[seed]:
+                continue
+            visited[seed] = True
+            frontier = np.array([seed], dtype=np.int64)
+            members = [frontier]
+            while frontier.size:
+                neighbors, _ = self._expand_frontier(frontier)
+                frontier, _ = self._first_visits(neighbors, visited, slot)
+                members.append(frontier)
+            self._uf.assign(np.concatenate(members), seed)
+
     def print_branches(self):
         """
         打印所有连通分支
@@ -253,88 +1763,175 @@ class AugmentedKAryNCube:
         components = self.uf.get_connected_components()
         print("\n连通分支:")
         for root, nodes in components.items():
-            print(f"分支 {root}: {nodes}")
+            print(f"分支 {self._to_api(root)}: {self._path_to_api(nodes)}")
 
     def are_connected(self, node1, node2):
         """
         检查两个节点是否连通（使用并查集）
         """
-        if (self.node_states.get(node1) == "faulty" or
-                self.node_states.get(node2) == "faulty"):
+        node1 = self._to_id(node1)
+        node2 = self._to_id(node2)
+        if self.faulty[node1] or self.faulty[node2]:
             return False
         return self.uf.connected(node1, node2)
 
+    def are_connected_many(self, sources, sinks):
+        """
+        批量检查节点对是否连通：直接比较连通分支索引中的分支编号
+
+        :param sources: 源节点数组（坐标数组或整数编号数组）
+        :param sinks: 目标节点数组，与 sources 一一对应
+        :return: 布尔数组，第 i 项表示 sources[i] 与 sinks[i] 是否连通（任一端故障时为 False）
+        """
+        labels = self.components.labels
+        source_labels = labels[self._to_ids(sources)]
+        sink_labels = labels[self._to_ids(sinks)]
+        return (source_labels == sink_labels) & (source_labels >= 0)
+
     def get_source_sink_different_branches(self):
         """
         从不同的连通分支中选择 source 和 sink，
         source 来自最大的分支，sink 从剩余的分支中随机选择
         """
-        components = self.uf.get_connected_components()
-        branches = list(components.values())
+        components = self.components  # 分支已按大小降序排列
 
-        if len(branches) < 2:
+        if len(components) < 2:
             raise ValueError("无法从不同的分支中选择 source 和 sink")
 
-        # 按照分支大小排序，选择最大的分支
-        branches.sort(key=len, reverse=True)
-        largest_branch = branches[0]  # 最大的分支
-        other_branches = branches[1:]  # 其余分支
-
-        # 选择 source
-        source = random.choice(largest_branch)
+        # 从最大的分支（0 号）中选择 source
+        source = components.choice(0)
 
-        # 从剩余分支中选择一个分支，再选一个 sink
-        chosen_branch = random.choice(other_branches)
-        sink = random.choice(chosen_branch)
+        # 从其余分支中选择一个分支，再选一个 sink
+        chosen_branch = random.choice(range(1, len(components)))
+        sink = components.choice(chosen_branch)
 
-        return source, sink
+        return self._to_api(source), self._to_api(sink)
 
-    def get_source_sink_largest_branch(self):
+    def get_source_sink_largest_branch(self, use_oracle=False):
         """
         从最大的连通分支中随机选择 source 和 sink，确保它们的坐标差异尽可能大
+
+        :param use_oracle: 为 True 时按无故障拓扑中的真实距离（DistanceOracle）选择相距最远的一对，
+                           否则按坐标差的绝对值之和
         """
-        components = self.uf.get_connected_components()
-        largest_branch = max(components.values(), key=len)
+        components = self.components
+        largest_size = int(components.sizes[0]) if len(components) else 0
 
-        if len(largest_branch) < 2:
+        if largest_size < 2:
             raise ValueError("最大分支节点数不足，无法选择两个不同的点")
 
         # 随机选取两个点
-        candidates = random.sample(largest_branch, min(10, len(largest_branch)))  # 选取最多 10 个点进行比较
+        candidates = components.sample(0, min(10, largest_size))  # 选取最多 10 个点进行比较
+        if use_oracle:
+            oracle = self.topology.distance_oracle
+            best_pair = max(itertools.combinations(candidates, 2),
+                            key=lambda pair: oracle.distance(pair[0], pair[1]))
+            return self._to_api(best_pair[0]), self._to_api(best_pair[1])
+
+        candidates = [self.decode_node(node) for node in candidates]
         best_pair = max(itertools.combinations(candidates, 2),
                         key=lambda pair: sum(abs(a - b) for a, b in zip(pair[0], pair[1])))
 
+        if self.int_ids:
+            return tuple(self.encode_node(node) for node in best_pair)
         return best_pair
 
-    def find_fault_free_path(self, start, end):
+    def find_fault_free_path(self, start, end, use_oracle=False):
         """
         结合改进的贪心策略和 BFS，在 AQn,k 拓扑中查找无故障路径
         (修正版本，符合HGBRouting算法描述)
+
+        :param use_oracle: 为 True 时贪心阶段按无故障拓扑中的真实距离（DistanceOracle）为候选邻居打分，
+                           否则按环形曼哈顿距离
+        """
+        start = self._to_id(start)
+        end = self._to_id(end)
+        return self._cached_query(("find_fault_free_path", use_oracle), start, end,
+                                  lambda: self._find_fault_free_path(start, end, use_oracle))
+
+    def _cached_query(self, algorithm, start, end, search):
+        """
+        带 LRU 缓存的路径查询（需 path_cache_size > 0），按 (algorithm, start, end) 缓存内部结果；
+        故障状态改变（fault_epoch 变化）后整个缓存失效。命中时搜索时间替换为本次查找耗时
+
+        :param search: 未命中时执行的查询，返回 (是否存在路径, 整数编号路径, 搜索时间, ...)
+        :return: 路径转换为对外表示后的查询结果
+        """
+        if not self.path_cache_size:
+            found, path, *rest = search()
+            return (found, self._path_to_api(path), *rest)
+
+        start_time = time.time()
+        cache = self._path_cache
+        if self._path_cache_epoch != self.fault_epoch:
+            cache.clear()
+            self._path_cache_epoch = self.fault_epoch
+
+        key = (algorithm, start, end)
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            self.path_cache_hits += 1
+            found, path, _, *rest = result
+            return (found, self._path_to_api(list(path)), time.time() - start_time, *rest)
+
+        self.path_cache_misses += 1
+        result = search()
+        cache[key] = result
+        if len(cache) > self.path_cache_size:
+            cache.popitem(last=False)
+        found, path, *rest = result
+        return (found, self._path_to_api(list(path)), *rest)  # 返回副本，调用方修改路径不影响缓存
+
+    def _ring_distance_change(self, current_digits, end_digits, first, last, direction):
+        """
+        计算第 first..last 维同时移动 direction 后，到终点的环形曼哈顿距离的变化量
+        """
+        k = self.k
+        change = 0
+        for d in range(first, last + 1):
+            old = abs(current_digits[d] - end_digits[d])
+            new = abs((current_digits[d] + direction) % k - end_digits[d])
+            change += min(new, k - new) - min(old, k - old)
+        return change
+
+    def _find_fault_free_path(self, start, end, use_oracle=False):
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        find_fault_free_path 的内部实现（整数编号）
+        """
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0, False
 
-        if not self.are_connected(start, end):  # 快速连通性检查
+        if not self.uf.connected(start, end):  # 快速连通性检查
             return False, [], 0, False
 
         start_time = time.time()
         path = [start]
         current = start
+        k = self.k
+        current_digits = self._digits(start)
+        end_digits = self._digits(end)
+        oracle = self.topology.distance_oracle if use_oracle else None
 
         # 贪心阶段：优先使用多维度跳转
         while current != end:
             # 计算差异维度并降序排序
-            diff_dims = [i for i in range(self.n) if current[i] != end[i]]
+            diff_dims = [i for i in range(self.n) if current_digits[i] != end_digits[i]]
             diff_dims.sort(reverse=True)  # 按维度降序
 
+            # 当前节点到终点的环形曼哈顿距离，候选邻居只需增量计算
+            current_diff = sum(
+                min(abs(current_digits[d] - end_digits[d]),
+                    k - abs(current_digits[d] - end_digits[d]))
+                for d in range(self.n))
+
             found_next = False
 
             # 遍历所有差异维度
             for i in diff_dims:
                 # 计算最佳方向
-                delta = (end[i] - current[i]) % self.k
-                direction = +1 if delta <= self.k // 2 else -1
+                delta = (end_digits[i] - current_digits[i]) % k
+                direction = +1 if delta <= k // 2 else -1
 
                 # 生成两种候选邻居
                 single_neighbor = self._get_neighbor(current, i, direction)
@@ -344,21 +1941,21 @@ class AugmentedKAryNCube:
                 valid_neighbors = []
 
                 # 检查单维度邻居
-                if (single_neighbor in self.node_states and
-                        self.node_states[single_neighbor] == "fault-free"):
-                    single_diff = sum(
-                        min(abs(single_neighbor[d] - end[d]),
-                            self.k - abs(single_neighbor[d] - end[d]))
-                        for d in range(self.n))
+                if not self.faulty[single_neighbor]:
+                    if oracle is not None:
+                        single_diff = oracle.distance(single_neighbor, end)
+                    else:
+                        single_diff = current_diff + self._ring_distance_change(
+                            current_digits, end_digits, i, i, direction)
                     valid_neighbors.append((single_diff, False, single_neighbor))
 
                 # 检查多维度邻居
-                if (multi_neighbor in self.node_states and
-                        self.node_states[multi_neighbor] == "fault-free"):
-                    multi_diff = sum(
-                        min(abs(multi_neighbor[d] - end[d]),
-                            self.k - abs(multi_neighbor[d] - end[d]))
-                        for d in range(self.n))
+                if not self.faulty[multi_neighbor]:
+                    if oracle is not None:
+                        multi_diff = oracle.distance(multi_neighbor, end)
+                    else:
+                        multi_diff = current_diff + self._ring_distance_change(
+                            current_digits, end_digits, 0, i, direction)
                     valid_neighbors.append((multi_diff, True, multi_neighbor))
 
                 if not valid_neighbors:
@@ -371,6 +1968,8 @@ class AugmentedKAryNCube:
                 best_diff, is_multi, best_neighbor = valid_neighbors[0]
                 path.append(best_neighbor)
                 current = best_neighbor
+                for d in (range(i + 1) if is_multi else (i,)):
+                    current_digits[d] = (current_digits[d] + direction) % k
                 found_next = True
                 break  # 处理下一个节点
 
@@ -382,7 +1981,7 @@ class AugmentedKAryNCube:
             return True, path, time.time() - start_time, False
 
         # BFS阶段：完成剩余路径
-        bfs_success, bfs_path, bfs_time = self.bfs(current, end)
+        bfs_success, bfs_path, bfs_time = self._bfs(current, end, build_tree=False)
 
         if bfs_success:
             path += bfs_path[1:]  # 去掉重复的当前节点
@@ -398,44 +1997,39 @@ class AugmentedKAryNCube:
         :param end: 目标节点
         :return: (是否存在路径, 路径列表, 搜索时间)
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        start = self._to_id(start)
+        end = self._to_id(end)
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0
 
         start_time = time.time()
         visited = set()
-        path = []
+        path = [start]  # 当前递归路径，进入时追加、回溯时弹出
 
-        def dfs_helper(current, target, current_path):
+        def dfs_helper(current, target):
             if current == target:
-                path.extend(current_path)
                 return True
 
             visited.add(current)
 
             # 获取所有无故障邻居节点
-            for i in range(self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_neighbor(current, i, direction)
-                    if (neighbor not in visited and
-                            self.node_states.get(neighbor) == "fault-free"):
-                        if dfs_helper(neighbor, target, current_path + [neighbor]):
-                            return True
-            for i in range(1, self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_cascading_neighbor(current, i, direction)
-                    if (neighbor not in visited and
-                            self.node_states.get(neighbor) == "fault-free"):
-                        if dfs_helper(neighbor, target, current_path + [neighbor]):
-                            return True
+            for neighbor in self._neighbor_ids(current):
+                if (neighbor not in visited and
+                        not self.faulty[neighbor]):
+                    path.append(neighbor)
+                    if dfs_helper(neighbor, target):
+                        return True
+                    path.pop()
 
             return False
 
-        found = dfs_helper(start, end, [start])
+        found = dfs_helper(start, end)
+        if not found:
+            path = []
         end_time = time.time()
         search_time = end_time - start_time
 
-        return found, path, search_time
+        return found, self._path_to_api(path), search_time
 
     def dfs(self, start, end):
         """
@@ -445,36 +2039,30 @@ class AugmentedKAryNCube:
         :param end: 目标节点
         :return: (是否存在路径, 路径列表, 搜索时间)
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        start = self._to_id(start)
+        end = self._to_id(end)
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0
 
         start_time = time.time()
-        stack = [(start, [start])]  # 栈中存储 (当前节点, 当前路径)
-        visited = set()
+        stack = [(start, -1)]  # 栈中存储 (当前节点, 入栈时的父节点)
+        parent = {}  # 节点 -> 首次出栈时的父节点，起点为 -1
 
         while stack:
-            current, path = stack.pop()
-            if current in visited:
+            current, current_parent = stack.pop()
+            if current in parent:
                 continue
-            visited.add(current)
+            parent[current] = current_parent
 
             if current == end:
-                return True, path, round(time.time() - start_time, 6)
+                path = self._reconstruct_path(parent, end)
+                return True, self._path_to_api(path), round(time.time() - start_time, 6)
 
             # 获取所有无故障邻居节点（优先入栈的会后出，模拟递归的搜索顺序）
             neighbors = []
-            for i in range(self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_neighbor(current, i, direction)
-                    if neighbor not in visited and self.node_states.get(neighbor) == "fault-free":
-                        neighbors.append((neighbor, path + [neighbor]))
-
-            for i in range(1, self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_cascading_neighbor(current, i, direction)
-                    if neighbor not in visited and self.node_states.get(neighbor) == "fault-free":
-                        neighbors.append((neighbor, path + [neighbor]))
+            for neighbor in self._neighbor_ids(current):
+                if neighbor not in parent and not self.faulty[neighbor]:
+                    neighbors.append((neighbor, current))
 
             # 逆序入栈，确保搜索顺序和递归一致
             stack.extend(reversed(neighbors))
@@ -489,107 +2077,377 @@ class AugmentedKAryNCube:
         :param end: 目标节点
         :return: (是否存在路径, 路径列表, 搜索时间)
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        start = self._to_id(start)
+        end = self._to_id(end)
+        return self._cached_query("bfs", start, end, lambda: self._bfs(start, end))
+
+    def _bfs(self, start, end, build_tree=True):
+        """
+        bfs 的内部实现（整数编号）
+        启用最短路径树缓存时，先查找以 start 或 end 为根的缓存树；
+        未命中、build_tree 为 True 且一棵树能放入缓存时构建以 start 为根的树，再沿父节点回溯，
+        否则退回到找到 end 即停止的普通 BFS
+        """
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0
 
         start_time = time.time()
 
-        visited = {start}
-        queue = deque([(start, [start])])
+        if self.sssp_cache_bytes:
+            tree_path = self._tree_path(start, end)
+            if tree_path is None and build_tree and self._tree_fits_cache():
+                tree_path = self._walk_tree(self._sssp_tree(start), end)
+            if tree_path is not None:
+                found, path = tree_path
+                return found, path, time.time() - start_time
+
+        parent = {start: -1}  # 节点 -> 父节点，同时作为已访问集合
+        queue = deque([start])
 
         while queue:
-            current, path = queue.popleft()
+            current = queue.popleft()
 
             if current == end:
+                path = self._reconstruct_path(parent, end)
                 end_time = time.time()
                 search_time = end_time - start_time
                 return True, path, search_time
 
             # 获取所有无故障邻居节点
-            for i in range(self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_neighbor(current, i, direction)
-                    if (neighbor not in visited and
-                            self.node_states.get(neighbor) == "fault-free"):
-                        visited.add(neighbor)
-                        queue.append((neighbor, path + [neighbor]))
-            for i in range(1, self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_cascading_neighbor(current, i, direction)
-                    if (neighbor not in visited and
-                            self.node_states.get(neighbor) == "fault-free"):
-                        visited.add(neighbor)
-                        queue.append((neighbor, path + [neighbor]))
+            for neighbor in self._neighbor_ids(current):
+                if (neighbor not in parent and
+                        not self.faulty[neighbor]):
+                    parent[neighbor] = current
+                    queue.append(neighbor)
 
         end_time = time.time()
         search_time = end_time - start_time
         return False, [], search_time
 
+    def frontier_bfs(self, start, end, direction_optimizing=True):
+        """
+        逐层同步的向量化BFS：每一步用 NumPy 数组整体扩展当前层，
+        使用 visited/parent 数组记录搜索状态，不使用逐节点的队列
+
+        :param start: 起始节点
+        :param end: 目标节点
+        :param direction_optimizing: 当前层较大时切换为自底向上扩展（方向优化BFS）
+        :return: (是否存在路径, 路径列表, 搜索时间)
+        """
+        found, path, search_time = self._frontier_bfs(
+            self._to_id(start), self._to_id(end), direction_optimizing)
+        return found, self._path_to_api(path), search_time
+
+    def _frontier_bfs(self, start, end, direction_optimizing=True):
+        """
+        frontier_bfs 的内部实现（整数编号）
+        """
+        if self.faulty[start] or self.faulty[end]:
+            return False, [], 0
+
+        start_time = time.time()
+        parent, dist = self._bfs_tree(start, end, direction_optimizing)
+        if dist[end] < 0:
+            return False, [], time.time() - start_time
+
+        path = self._reconstruct_path(parent, end)
+        return True, path, time.time() - start_time
+
+    def _bfs_tree(self, start, end=None, direction_optimizing=True):
+        """
+        从 start 出发逐层向量化BFS，end 不为 None 时在访问到 end 后停止，否则遍历整个连通分支
+
+        :return: (parent, dist)：父节点数组（根与未访问节点为 -1）和跳数数组（未访问为 -1）
+        """
+        parent = np.full(self.num_nodes, -1, dtype=np.int64)
+        dist = np.full(self.num_nodes, -1, dtype=np.int32)
+        dist[start] = 0
+        visited = self.fault_mask.copy()  # 故障节点视为已访问
+        visited[start] = True
+        unvisited_count = self.num_nodes - int(np.count_nonzero(visited))
+        frontier = np.array([start], dtype=np.int64)
+        bottom_up = False
+        level = 0
+
+        while frontier.size and (end is None or not visited[end]):
+            # 选择扩展方向：度数均为常数，用节点数代替边数比较
+            if direction_optimizing:
+                if not bottom_up and frontier.size * self._BFS_ALPHA > unvisited_count:
+                    bottom_up = True
+                elif bottom_up and frontier.size * self._BFS_BETA < self.num_nodes:
+                    bottom_up = False
+
+            if bottom_up:
+                frontier = self._bottom_up_step(frontier, visited, parent)
+            else:
+                frontier = self._top_down_step(frontier, visited, parent)
+            unvisited_count -= frontier.size
+            level += 1
+            dist[frontier] = level
+
+        return parent, dist
+
+    def sssp_tree(self, source):
+        """
+        以 source 为根的单源最短路径树，按 (source, fault_epoch) 缓存
+        （需 sssp_cache_bytes 不小于一棵树的大小，否则每次重新构建且不缓存）
+
+        :param source: 根节点（无故障）
+        :return: (parent, dist)：与 _bfs_tree 相同，按节点编号索引的父节点编号数组（根与不可达节点为 -1）
+                 和跳数数组（不可达为 -1）
+        """
+        source = self._to_id(source)
+        if self.faulty[source]:
+            raise ValueError(f"故障节点不能作为最短路径树的根: {self._to_api(source)}")
+        return self._sssp_tree(source)
+
+    def _sssp_tree(self, source):
+        """
+        sssp_tree 的内部实现（整数编号）：命中缓存时直接返回，否则构建并按内存上限缓存
+        """
+        tree = self._cached_tree(source)
+        if tree is None:
+            parent, dist = self._bfs_tree(source)
+            tree = (parent.astype(_node_dtype(self.num_nodes)), dist)
+            if self._tree_fits_cache():
+                self._store_tree(source, tree)
+        return tree
+
+    def _tree_fits_cache(self):
+        """
+        一棵最短路径树（父节点数组与 int32 跳数数组）能否放入缓存
+        """
+        itemsize = np.dtype(_node_dtype(self.num_nodes)).itemsize + np.dtype(np.int32).itemsize
+        return self.num_nodes * itemsize <= self.sssp_cache_bytes
+
+    def _cached_tree(self, source):
+        """
+        当前故障状态下以 source 为根的缓存树，未缓存时返回 None
+        """
+        key = (source, self.fault_epoch)
+        tree = self._sssp_cache.get(key)
+        if tree is not None:
+            self._sssp_cache.move_to_end(key)
+        return tree
+
+    def _store_tree(self, source, tree):
+        """
+        缓存最短路径树：先丢弃旧故障状态下的树，再按 LRU 淘汰直到不超过内存上限
+        """
+        size = sum(array.nbytes for array in tree)
+        if size > self.sssp_cache_bytes:
+            return
+        cache = self._sssp_cache
+        for key in [key for key in cache if key[1] != self.fault_epoch]:
+            self._sssp_cache_used -= sum(array.nbytes for array in cache.pop(key))
+        while self._sssp_cache_used + size > self.sssp_cache_bytes:
+            _, evicted = cache.popitem(last=False)
+            self._sssp_cache_used -= sum(array.nbytes for array in evicted)
+        cache[(source, self.fault_epoch)] = tree
+        self._sssp_cache_used += size
+
+    def _walk_tree(self, tree, end):
+        """
+        沿最短路径树的父节点从 end 回溯到根，返回 (是否可达, 根到 end 的路径)
+        """
+        parent, dist = tree
+        if dist[end] < 0:
+            return False, []
+        return True, self._reconstruct_path(parent, end)
+
+    def _tree_path(self, start, end):
+        """
+        用缓存的最短路径树回答 start 到 end 的查询（图是无向的，以 end 为根的树同样可用），
+        两者都未缓存时返回 None
+        """
+        tree = self._cached_tree(start)
+        if tree is not None:
+            return self._walk_tree(tree, end)
+        tree = self._cached_tree(end)
+        if tree is not None:
+            found, path = self._walk_tree(tree, start)
+            return found, path[::-1]
+        return None
+
+    def _top_down_step(self, frontier, visited, parent):
+        """
+        自顶向下扩展一层：由当前层的每个节点查找未访问的邻居，返回新的一层
+        """
+        neighbors, sources = self._expand_frontier(frontier)
+        new = ~visited[neighbors]
+        # 同一层中被多次发现的节点只保留一个父节点
+        next_frontier, first = np.unique(neighbors[new], return_index=True)
+        parent[next_frontier] = sources[new][first]
+        visited[next_frontier] = True
+        return next_frontier
+
+    def _bottom_up_step(self, frontier, visited, parent):
+        """
+        自底向上扩展一层：每个未访问的无故障节点检查是否有邻居在当前层中，返回新的一层
+        AQ(n,k) 的生成元集合关于取反封闭，入邻居即出邻居
+        """
+        in_frontier = np.zeros(self.num_nodes, dtype=bool)
+        in_frontier[frontier] = True
+        candidates = np.flatnonzero(~visited)
+
+        found = []
+        for block_start in range(0, len(candidates), self._EXPAND_BLOCK_SIZE):
+            block = candidates[block_start:block_start + self._EXPAND_BLOCK_SIZE]
+            rows = self._neighbor_rows(block)
+            hits = in_frontier[rows]
+            has_parent = hits.any(axis=1)
+            parent[block[has_parent]] = rows[has_parent, hits[has_parent].argmax(axis=1)]
+            found.append(block[has_parent])
+
+        next_frontier = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        visited[next_frontier] = True
+        return next_frontier
+
+    def _neighbor_rows(self, nodes):
+        """
+        一组节点的邻居矩阵，形状为 (len(nodes), 度数)，不区分故障状态
+        """
+        return self.topology.neighbor_rows(nodes)
+
+    def _expand_frontier(self, frontier):
+        """
+        扩展一层节点，返回 (邻居数组, 对应的源节点数组)，不区分故障状态
+        """
+        neighbors = self._neighbor_rows(frontier)
+        sources = np.broadcast_to(frontier[:, None], neighbors.shape)
+        return neighbors.reshape(-1), sources.reshape(-1)
+
+    @staticmethod
+    def _reconstruct_path(parent, end):
+        """
+        沿父节点数组（或字典）从终点回溯到起点（父节点为 -1），返回起点到终点的路径
+        """
+        path = []
+        current = int(end)
+        while current != -1:
+            path.append(current)
+            current = int(parent[current])
+        path.reverse()
+        return path
+
+    def build_routing_table(self):
+        """
+        按当前故障状态预计算下一跳路由表（RoutingTable），适用于中小规模的立方体：
+        内存为各连通分支大小的平方之和（字节），构建需要对每个无故障节点做一次BFS
+        """
+        start_time = time.time()
+        self.routing_table = RoutingTable(self)
+        self.routing_build_time = time.time() - start_time
+        return self.routing_table
+
+    def table_route(self, start, end):
+        """
+        查下一跳路由表逐跳转发，得到最短无故障路径，不做任何搜索；
+        路由表不存在或故障状态已改变时先重建
+
+        :param start: 起始节点
+        :param end: 目标节点
+        :return: (是否存在路径, 路径列表, 查询时间)
+        """
+        start = self._to_id(start)
+        end = self._to_id(end)
+        if self.faulty[start] or self.faulty[end]:
+            return False, [], 0
+
+        table = self.routing_table
+        if table is None or table.fault_epoch != self.fault_epoch:
+            table = self.build_routing_table()
+
+        start_time = time.time()
+        component = table.labels[start]
+        if component != table.labels[end]:
+            return False, [], time.time() - start_time
+
+        positions = table.positions
+        ports = table.tables[component][positions[end]]  # 所有节点走向 end 的端口号
+        path = [start]
+        current = start
+        while current != end:
+            current = self._neighbor_ids(current)[ports[positions[current]]]
+            path.append(current)
+        return True, self._path_to_api(path), time.time() - start_time
+
     def _heuristic_distance(self, node1, node2):
         """
         计算两个节点之间的启发式距离（曼哈顿距离的环形版本）
         考虑k-ary n-cube的环形拓扑结构
         """
-        distance = 0
-        for i in range(self.n):
-            # 计算在第i维上的最短距离（考虑环形结构）
-            direct_dist = abs(node1[i] - node2[i])
-            wrap_dist = self.k - direct_dist
-            distance += min(direct_dist, wrap_dist)
-        return distance
+        # 逐维计算最短距离（考虑环形结构）：正向走 diff 步或反向走 k - diff 步
+        return sum(min(diff, self.k - diff)
+                   for diff in _digit_differences(self.n, self.k, node1, node2))
 
-    def astar(self, start, end):
+    def astar(self, start, end, heuristic="manhattan"):
         """
         使用A*算法查找两个无故障节点之间的最短无故障路径
 
         :param start: 起始节点
         :param end: 目标节点
+        :param heuristic: 启发式，"manhattan" 为环形曼哈顿距离（(≤i,±1) 边一步可改变多维，会高估距离，
+                          不可采纳）；"pdb" 为模式数据库启发式（可采纳，保证路径最短）
         :return: (是否存在路径, 路径列表, 搜索时间)
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        start = self._to_id(start)
+        end = self._to_id(end)
+        return self._cached_query(("astar", heuristic), start, end,
+                                  lambda: self._astar(start, end, heuristic))
+
+    def _astar(self, start, end, heuristic="manhattan"):
+        """
+        astar 的内部实现（整数编号）
+        """
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0
 
+        # f_score 相同时的次序：manhattan 保持小 g_score 优先；
+        # pdb 在无故障区域内等于真实距离，大 g_score 优先可沿最短路径直达终点，避免逐层展开平局节点
+        if heuristic == "manhattan":
+            heuristic_distance = self._heuristic_distance
+            deeper_first = False
+        elif heuristic == "pdb":
+            heuristic_distance = self.topology.pattern_database().heuristic
+            deeper_first = True
+        else:
+            raise ValueError(f"未知启发式类型: {heuristic}")
+
         start_time = time.time()
 
-        # 优先队列：(f_score, g_score, node, path)
+        # 已缓存以 start 或 end 为根的最短路径树时直接回溯
+        if self.sssp_cache_bytes:
+            tree_path = self._tree_path(start, end)
+            if tree_path is not None:
+                found, path = tree_path
+                return found, path, time.time() - start_time
+
+        # 优先队列：(f_score, 平局次序, g_score, node)
         # f_score = g_score + h_score
         open_set = []
-        heapq.heappush(open_set, (0, 0, start, [start]))
+        heapq.heappush(open_set, (0, 0, 0, start))
 
-        # 记录已访问的节点和它们的最佳g_score
+        # 记录已访问的节点和它们的最佳g_score，以及取得该g_score时的父节点
         visited = {}
         visited[start] = 0
+        parent = {start: -1}
 
         while open_set:
-            f_score, g_score, current, path = heapq.heappop(open_set)
+            f_score, _, g_score, current = heapq.heappop(open_set)
 
             # 如果当前节点已经被更好的路径访问过，跳过
             if current in visited and visited[current] < g_score:
                 continue
 
             if current == end:
+                path = self._reconstruct_path(parent, end)
                 end_time = time.time()
                 search_time = end_time - start_time
                 return True, path, search_time
 
             # 获取所有无故障邻居节点
-            neighbors = []
-
-            # 单维度邻居
-            for i in range(self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_neighbor(current, i, direction)
-                    if self.node_states.get(neighbor) == "fault-free":
-                        neighbors.append(neighbor)
-
-            # 多维度邻居
-            for i in range(1, self.n):
-                for direction in [-1, 1]:
-                    neighbor = self._get_cascading_neighbor(current, i, direction)
-                    if self.node_states.get(neighbor) == "fault-free":
-                        neighbors.append(neighbor)
+            neighbors = self._get_neighbors(current)
 
             for neighbor in neighbors:
                 tentative_g_score = g_score + 1  # 每步的代价为1
@@ -597,10 +2455,11 @@ class AugmentedKAryNCube:
                 # 如果这个邻居没有被访问过，或者找到了更好的路径
                 if neighbor not in visited or tentative_g_score < visited[neighbor]:
                     visited[neighbor] = tentative_g_score
-                    h_score = self._heuristic_distance(neighbor, end)
+                    parent[neighbor] = current
+                    h_score = heuristic_distance(neighbor, end)
                     f_score = tentative_g_score + h_score
-                    new_path = path + [neighbor]
-                    heapq.heappush(open_set, (f_score, tentative_g_score, neighbor, new_path))
+                    tie_break = -tentative_g_score if deeper_first else tentative_g_score
+                    heapq.heappush(open_set, (f_score, tie_break, tentative_g_score, neighbor))
 
         end_time = time.time()
         search_time = end_time - start_time
@@ -608,25 +2467,10 @@ class AugmentedKAryNCube:
 
     def _get_neighbors(self, node):
         """
-        获取节点的所有无故障邻居
+        获取节点的所有无故障邻居（整数编号）
         """
-        neighbors = []
-
-        # 单维度邻居
-        for i in range(self.n):
-            for direction in [-1, 1]:
-                neighbor = self._get_neighbor(node, i, direction)
-                if self.node_states.get(neighbor) == "fault-free":
-                    neighbors.append(neighbor)
-
-        # 多维度邻居
-        for i in range(1, self.n):
-            for direction in [-1, 1]:
-                neighbor = self._get_cascading_neighbor(node, i, direction)
-                if self.node_states.get(neighbor) == "fault-free":
-                    neighbors.append(neighbor)
-
-        return neighbors
+        return [neighbor for neighbor in self._neighbor_ids(node)
+                if not self.faulty[neighbor]]
 
     def bidirectional_bfs(self, start, end):
         """
@@ -637,8 +2481,16 @@ class AugmentedKAryNCube:
         :param end: 目标节点
         :return: (是否存在路径, 路径列表, 搜索时间)
         """
-        if (self.node_states.get(start) == "faulty" or
-                self.node_states.get(end) == "faulty"):
+        start = self._to_id(start)
+        end = self._to_id(end)
+        return self._cached_query("bidirectional_bfs", start, end,
+                                  lambda: self._bidirectional_bfs(start, end))
+
+    def _bidirectional_bfs(self, start, end):
+        """
+        bidirectional_bfs 的内部实现（整数编号）
+        """
+        if self.faulty[start] or self.faulty[end]:
             return False, [], 0
 
         if start == end:
@@ -694,6 +2546,55 @@ class AugmentedKAryNCube:
         end_time = time.time()
         return False, [], end_time - start_time
 
+    def balanced_bidirectional_bfs(self, start, end):
+        """
+        层平衡的双向BFS：每一步从当前层较小的一侧整体扩展一层（向量化），
+        并在发现新节点时检测与另一侧的相遇，保证找到最短路径
+
+        :param start: 起始节点
+        :param end: 目标节点
+        :return: (是否存在路径, 路径列表, 搜索时间)
+        """
+        found, path, search_time = self._balanced_bidirectional_bfs(self._to_id(start), self._to_id(end))
+        return found, self._path_to_api(path), search_time
+
+    def _balanced_bidirectional_bfs(self, start, end):
+        """
+        balanced_bidirectional_bfs 的内部实现（整数编号）
+        """
+        if self.faulty[start] or self.faulty[end]:
+            return False, [], 0
+
+        if start == end:
+            return True, [start], 0
+
+        start_time = time.time()
+
+        # 下标 0 为前向搜索（从起点开始），1 为后向搜索（从终点开始）
+        fault_mask = self.fault_mask
+        parents = [np.full(self.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+        visited = [fault_mask.copy(), fault_mask.copy()]  # 故障节点视为已访问
+        visited[0][start] = True
+        visited[1][end] = True
+        frontiers = [np.array([start], dtype=np.int64), np.array([end], dtype=np.int64)]
+
+        # 任一侧的层为空说明该侧所在分支已搜索完毕，两点不连通
+        while frontiers[0].size and frontiers[1].size:
+            side = 0 if frontiers[0].size <= frontiers[1].size else 1
+            frontiers[side] = self._top_down_step(frontiers[side], visited[side], parents[side])
+
+            # 发现时检测相遇：设两侧已完整扩展到深度 a 和 b，长度不超过 a+b 的路径
+            # 在之前的步骤中就会被检测到，因此本步的任一相遇点都给出长度 a+b+1 的最短路径
+            meeting_points = frontiers[side][visited[1 - side][frontiers[side]]]
+            if meeting_points.size:
+                meeting_point = int(meeting_points[0])
+                forward_path = self._reconstruct_path(parents[0], meeting_point)
+                backward_path = self._reconstruct_path(parents[1], meeting_point)
+                path = forward_path + backward_path[-2::-1]
+                return True, path, time.time() - start_time
+
+        return False, [], time.time() - start_time
+
     def _reconstruct_bidirectional_path(self, meeting_point, forward_visited, backward_visited):
         """
         重构双向BFS找到的路径
@@ -792,7 +2693,7 @@ class AugmentedKAryNCube:
         # 创建NetworkX图
         G = nx.Graph()
         G.add_nodes_from(self.nodes)
-        G.add_edges_from(self.edges)
+        G.add_edges_from((self._to_api(u), self._to_api(v)) for u, v in self.edges.tolist())
 
         # 选择布局
         if layout == "circular":
@@ -33,27 +33,19 @@ def run_rq1_experiment(n, k, r, h, iterations=10):
         # 创建增强k元n立方体
         aq = AugmentedKAryNCube(n, k, r, h)
         
-        # 获取连通分支
-        components = aq.uf.get_connected_components()
+        # 获取连通分支索引（分支按大小降序排列）
+        components = aq.components
         
         # 选择源节点和目标节点（从不同分支中选择）
         if len(components) >= 2:
-            # 从不同分支选择
-            branch_sizes = [(branch_id, len(nodes)) for branch_id, nodes in components.items()]
-            branch_sizes.sort(key=lambda x: x[1], reverse=True)  # 按大小排序
-            
-            # 选择两个最大的分支
-            branch1_nodes = list(components[branch_sizes[0][0]])
-            branch2_nodes = list(components[branch_sizes[1][0]])
-            
-            source = random.choice(branch1_nodes)
-            sink = random.choice(branch2_nodes)
+            # 从两个最大的分支中各选一个节点
+            source = components.choice(0)
+            sink = components.choice(1)
             source_sink_from_different_branches = True
         else:
             # 如果只有一个分支，从同一分支选择
-            largest_branch = max(components.values(), key=len)
-            if len(largest_branch) >= 2:
-                source, sink = random.sample(largest_branch, 2)
+            if len(components) and components.sizes[0] >= 2:
+                source, sink = components.sample(0, 2)
                 source_sink_from_different_branches = False
             else:
                 print(f"    跳过迭代 {i+1}: 无足够节点")
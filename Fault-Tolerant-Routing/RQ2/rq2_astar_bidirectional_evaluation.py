@@ -34,16 +34,16 @@ def run_rq2_experiment(n, k, r, h, iterations=10):
         # 创建增强k元n立方体
         aq = AugmentedKAryNCube(n, k, r, h)
         
-        # 获取连通分支
-        components = aq.uf.get_connected_components()
+        # 获取连通分支索引（分支按大小降序排列）
+        components = aq.components
         
         # 选择源节点和目标节点（从同一分支中选择）
-        largest_branch = max(components.values(), key=len)
-        if len(largest_branch) >= 2:
-            source, sink = random.sample(largest_branch, 2)
+        largest_size = int(components.sizes[0]) if len(components) else 0
+        if largest_size >= 2:
+            source, sink = components.sample(0, 2)
             source_sink_from_different_branches = False
         else:
-            print(f"    跳过迭代 {i+1}: 最大分支节点数不足 ({len(largest_branch)})")
+            print(f"    跳过迭代 {i+1}: 最大分支节点数不足 ({largest_size})")
             continue
         
         # 1. A*算法